@@ -17,6 +17,60 @@ load_dotenv()
 
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+
+# LocMemCache is per process: with several gunicorn workers one worker's
+# invalidation never reaches the others, so the caches below default to the
+# shared DB cache (run createcachetable) whenever WEB_CONCURRENCY > 1.
+# gunicorn.conf.py sets it when unset, so 1 here means runserver or tests
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+SHARED_CACHE_BACKEND = 'db' if WEB_CONCURRENCY > 1 else 'locmem'
+
+# AI provider and background job queue (main_app/jobs.py)
+AI_LLM_BACKEND = os.getenv('AI_LLM_BACKEND', 'gemini')  # 'gemini', 'fake' or a dotted class path
+AI_MODEL = os.getenv('AI_MODEL', 'gemini-2.5-flash')
+AI_JOB_WORKERS = int(os.getenv('AI_JOB_WORKERS', 4))         # concurrent LLM calls per process
+AI_JOB_MAX_RETRIES = int(os.getenv('AI_JOB_MAX_RETRIES', 2))
+AI_JOB_BACKOFF = float(os.getenv('AI_JOB_BACKOFF', 1.0))     # seconds, doubled per retry
+AI_JOB_TIMEOUT = float(os.getenv('AI_JOB_TIMEOUT', 30))      # seconds per LLM call; enforced even if the client ignores it
+AI_JOBS_EAGER = os.getenv('AI_JOBS_EAGER', 'False') == 'True'
+AI_JOB_STALE_GRACE = float(os.getenv('AI_JOB_STALE_GRACE', 300))  # seconds past the retry budget before a queued/running job counts as orphaned
+AI_MAX_CONCURRENT_CALLS = int(os.getenv('AI_MAX_CONCURRENT_CALLS', 20))  # async LLM calls per process
+AI_CACHE_BACKEND = os.getenv('AI_CACHE_BACKEND', SHARED_CACHE_BACKEND)  # 'locmem' or 'db'
+AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', 60 * 60 * 24))   # seconds
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', 1000))
+
+# 'wsgi' or 'asgi', as in gunicorn.conf.py; under asgi AI jobs run on the event loop
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
+# Cached event/company GET responses (main_app/response_cache.py)
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', SHARED_CACHE_BACKEND)  # 'locmem' or 'db'
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 60 * 10))  # seconds; writes invalidate sooner
+
+# ?since= delta sync on tasks/missions (main_app/delta.py)
+DELTA_SYNC_LAG = float(os.getenv('DELTA_SYNC_LAG', 5))  # seconds; cursors trail the clock by this much
+DELTA_SYNC_RETENTION_DAYS = int(os.getenv('DELTA_SYNC_RETENTION_DAYS', 30))  # tombstones older than this are pruned
+
+# Task/mission push channel, GET /tasks/events/ (main_app/broker.py)
+PUSH_BROKER_BACKEND = os.getenv('PUSH_BROKER_BACKEND', 'memory')  # 'memory' or a dotted class path
+PUSH_QUEUE_SIZE = int(os.getenv('PUSH_QUEUE_SIZE', 100))   # per subscriber; overflow -> resync
+PUSH_HEARTBEAT = float(os.getenv('PUSH_HEARTBEAT', 15))    # seconds between keep-alive comments
+PUSH_TICKET_TTL = int(os.getenv('PUSH_TICKET_TTL', 30))    # seconds a ?ticket= for the stream stays valid
+
+# Bulk import/export, /bulk/import/ and /bulk/export/ (main_app/bulk.py)
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 500))  # rows validated and inserted per transaction
+
+# Cached per-event progress rollups, GET /events/<id>/stats/ (main_app/rollups.py)
+ROLLUP_CACHE_TTL = int(os.getenv('ROLLUP_CACHE_TTL', 60 * 10))  # seconds; task/mission writes invalidate sooner
+
+# Open task counts per profile for assignment, GET /teams/<id>/workload/ (main_app/workload.py)
+WORKLOAD_CACHE_TTL = int(os.getenv('WORKLOAD_CACHE_TTL', 60 * 10))  # seconds; task writes invalidate sooner
+
+# Per-profile role/team index used by main_app/permissions.py
+ACCESS_INDEX_TTL = int(os.getenv('ACCESS_INDEX_TTL', 300))  # seconds
+
+# Share of requests that get SQL/timing instrumentation (0 disables, 1 = every request).
+# Sampled requests cost a wrapper per query plus a log line, so keep this small in production
+INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('INSTRUMENTATION_SAMPLE_RATE', 0.01))
 SECRET_KEY = os.environ.get("SECRET_KEY")
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -28,9 +82,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'True') == 'True'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.getenv('ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -49,11 +103,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'main_app.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'main_app.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main_app.authentication.ProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,24 +145,32 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 DATABASES = {
     'default': {
-
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'capstone_project_db',
-
+        'ENGINE': os.environ.get('SQL_ENGINE', 'django.db.backends.postgresql'),
+        'NAME': os.environ.get('SQL_DATABASE', 'capstone_project_db'),
+        'USER': os.environ.get('SQL_USER', ''),
+        'PASSWORD': os.environ.get('SQL_PASSWORD', ''),
+        'HOST': os.environ.get('SQL_HOST', ''),
+        'PORT': os.environ.get('SQL_PORT', ''),
+        # Reuse connections across requests; health checks drop dead ones before use.
+        # Not under ASGI: each sync_to_async thread would keep its own connection open
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0 if SERVER_MODE == 'asgi' else 60)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'OPTIONS': {},
     }
 }
 
-# DATABASES = {
-#     "default": {
-#         "ENGINE": os.environ.get("SQL_ENGINE", "django.db.backends.sqlite3"),
-#         "NAME": os.environ.get("SQL_DATABASE", BASE_DIR / "db.sqlite3"),
-#         "USER": os.
-# environ.get("SQL_USER", "user"),
-#         "PASSWORD": os.environ.get("SQL_PASSWORD", "password"),
-#         "HOST": os.environ.get("SQL_HOST", "localhost"),
-#         "PORT": os.environ.get("SQL_PORT", "5432"),
-#     }
-# }
+# psycopg 3 connection pool (needs psycopg[pool]). Django requires
+# CONN_MAX_AGE = 0 with a pool, since the pool owns connection lifetime.
+# Django passes kwargs/open/configure/check to ConnectionPool itself; the
+# checkout health check follows CONN_HEALTH_CHECKS above.
+if os.environ.get('DB_POOL', 'False') == 'True':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),     # seconds to wait for a connection
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),  # close idle extras after this
+    }
 
 
 # Password validation
@@ -143,6 +208,17 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# WhiteNoise serves collected files with far-future cache headers and
+# pre-compressed variants; the manifest needs collectstatic, so only outside DEBUG
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -150,10 +226,43 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', SHARED_CACHE_BACKEND)  # 'locmem' or 'db'
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+}
+
+CACHES = {
+    # Shared app cache (permission index, progress rollups, workloads)
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': 'django_cache',
+    },
+    # AI responses keyed by prompt hash (main_app/ai_cache.py); LocMemCache evicts LRU
+    'ai': {
+        'BACKEND': CACHE_BACKENDS[AI_CACHE_BACKEND],
+        'LOCATION': 'ai_suggestion_cache',
+        'TIMEOUT': AI_CACHE_TTL,
+        'OPTIONS': {'MAX_ENTRIES': AI_CACHE_MAX_ENTRIES},
+    },
+    # Rendered event/company responses plus ETags (main_app/response_cache.py)
+    'responses': {
+        'BACKEND': CACHE_BACKENDS[RESPONSE_CACHE_BACKEND],
+        'LOCATION': 'response_cache',
+        'TIMEOUT': RESPONSE_CACHE_TTL,
+    },
+}
+
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'main_app.authentication.ProfileJWTAuthentication',
     ),
+    'EXCEPTION_HANDLER': 'main_app.permissions.exception_handler',  # 403s as {"error": ...}
     #     'DEFAULT_RENDERER_CLASSES': (
     #         'rest_framework.renderers.JSONRenderer',  # cancels the html and renders the json to test the backend
     #     ),
@@ -167,3 +276,20 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
 }
+
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # one JSON line per instrumented request
+        'main_app.instrumentation': {
+            'handlers': ['console'],
+            'level': os.getenv('INSTRUMENTATION_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,40 @@
+"""
+Gunicorn settings for the production image (`gunicorn -c gunicorn.conf.py`).
+
+SERVER_MODE=wsgi (default) serves backend.wsgi with threaded workers.
+SERVER_MODE=asgi serves backend.asgi with uvicorn workers, for async views.
+
+Graceful reload: `kill -HUP <master pid>` starts new workers and lets the
+old ones finish their in-flight requests (up to GRACEFUL_TIMEOUT).
+"""
+import multiprocessing
+import os
+
+server_mode = os.getenv('SERVER_MODE', 'wsgi')
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+
+# Rule of thumb from the gunicorn docs: (2 x cores) + 1. Exported so the
+# workers' settings see the real count and pick the shared DB caches
+os.environ.setdefault('WEB_CONCURRENCY', str(multiprocessing.cpu_count() * 2 + 1))
+workers = int(os.environ['WEB_CONCURRENCY'])
+
+if server_mode == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'backend.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+keepalive = int(os.getenv('KEEPALIVE', 5))               # seconds; keep behind a proxy's idle timeout
+timeout = int(os.getenv('WORKER_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers now and then so slow leaks can't accumulate; jitter avoids
+# every worker restarting at once
+max_requests = int(os.getenv('MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('MAX_REQUESTS_JITTER', 200))
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,68 @@
+import hashlib
+
+from django.core.cache import caches
+
+
+# ===============================
+# Content-addressed AI response cache
+# ===============================
+# Entries live in the 'ai' cache alias (see CACHES in settings), so TTL, LRU
+# eviction and the backend (local memory or DB table) are configured there.
+# The key is a hash of model + rendered prompt, prefixed with a per-event
+# generation number that signals bump when the event or its teams change.
+
+STATS_KEYS = ('ai-cache:hits', 'ai-cache:misses')
+
+
+def get_cache():
+    return caches['ai']
+
+
+def _generation_key(event_id):
+    return f'ai-cache:gen:{event_id}'
+
+
+def get_generation(event_id):
+    return get_cache().get_or_set(_generation_key(event_id), 0, timeout=None)
+
+
+def invalidate_event(event_id):
+    cache = get_cache()
+    try:
+        cache.incr(_generation_key(event_id))
+    except ValueError:
+        cache.set(_generation_key(event_id), 1, timeout=None)
+
+
+def make_key(event_id, model, prompt):
+    digest = hashlib.sha256(f'{model}\n{prompt}'.encode('utf-8')).hexdigest()
+    return f'ai-cache:{event_id}:{get_generation(event_id)}:{digest}'
+
+
+def _count(stat_key):
+    cache = get_cache()
+    try:
+        cache.incr(stat_key)
+    except ValueError:
+        cache.set(stat_key, 1, timeout=None)
+
+
+def get_response(event_id, model, prompt):
+    """Cached LLM text for this prompt, or None. Updates hit/miss counters."""
+    text = get_cache().get(make_key(event_id, model, prompt))
+    _count(STATS_KEYS[0] if text is not None else STATS_KEYS[1])
+    return text
+
+
+def set_response(event_id, model, prompt, text):
+    get_cache().set(make_key(event_id, model, prompt), text)
+
+
+def get_stats():
+    hits, misses = (get_cache().get(key, 0) for key in STATS_KEYS)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 3) if total else 0.0,
+    }
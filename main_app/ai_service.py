@@ -0,0 +1,250 @@
+import asyncio
+import json
+import threading
+import weakref
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import ai_cache
+from .instrumentation import span
+from .workload import pick_assignees
+
+
+# ===============================
+# LLM clients
+# ===============================
+class GeminiClient:
+    """
+    Thin wrapper around the Gemini SDK so callers only deal with prompt -> text.
+    The SDK is imported here, not at module level, so processes that never
+    call the AI (workers booting, manage.py commands, tests) don't pay for it.
+    """
+
+    def __init__(self):
+        from google import genai
+        self._client = genai.Client()
+
+    def generate(self, prompt, model, timeout=None):
+        response = self._client.models.generate_content(
+            model=model, contents=prompt, config=self._config(timeout))
+        return response.text
+
+    async def agenerate(self, prompt, model, timeout=None):
+        response = await self._client.aio.models.generate_content(
+            model=model, contents=prompt, config=self._config(timeout))
+        return response.text
+
+    @staticmethod
+    def _config(timeout):
+        if not timeout:
+            return None
+        from google.genai import types
+        return types.GenerateContentConfig(
+            http_options=types.HttpOptions(timeout=int(timeout * 1000))
+        )
+
+
+class FakeLLMClient:
+    """
+    Offline client for tests and local runs. Returns `response` for every
+    prompt and records the prompts it was given.
+    """
+
+    def __init__(self, response=None):
+        self.response = response or json.dumps({
+            "title": "Prepare venue logistics",
+            "description": "Coordinate setup, seating and signage before the event opens."
+        })
+        self.prompts = []
+
+    def generate(self, prompt, model, timeout=None):
+        self.prompts.append(prompt)
+        return self.response
+
+    async def agenerate(self, prompt, model, timeout=None):
+        return self.generate(prompt, model, timeout)
+
+
+LLM_BACKENDS = {
+    'gemini': GeminiClient,
+    'fake': FakeLLMClient,
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """
+    Build the AI_LLM_BACKEND client on first use. The setting is a key of
+    LLM_BACKENDS or a dotted path to any class with generate(prompt, model, timeout)
+    (and optionally an async agenerate with the same signature).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                backend = settings.AI_LLM_BACKEND
+                backend_class = LLM_BACKENDS.get(backend) or import_string(backend)
+                _client = backend_class()
+    return _client
+
+
+def set_llm_client(client):
+    """Swap the process-wide client (tests use this to install a FakeLLMClient)."""
+    global _client
+    _client = client
+
+
+# One semaphore per event loop: asyncio primitives can't be shared across loops
+_upstream_slots = weakref.WeakKeyDictionary()
+
+
+def upstream_slot():
+    """Semaphore capping concurrent async LLM calls at AI_MAX_CONCURRENT_CALLS."""
+    loop = asyncio.get_running_loop()
+    slot = _upstream_slots.get(loop)
+    if slot is None:
+        slot = _upstream_slots[loop] = asyncio.Semaphore(settings.AI_MAX_CONCURRENT_CALLS)
+    return slot
+
+
+def generate(prompt, model, timeout=None):
+    """
+    Sync LLM call. Clients may ignore `timeout` (FakeLLMClient, dotted
+    backends), so the call runs in a daemon thread and is abandoned with
+    TimeoutError once `timeout` seconds pass.
+    """
+    client = get_llm_client()
+    if not timeout:
+        return client.generate(prompt, model=model, timeout=timeout)
+    future = Future()
+
+    def call():
+        try:
+            future.set_result(client.generate(prompt, model=model, timeout=timeout))
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=call, name='llm-call', daemon=True).start()
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise TimeoutError(f'LLM call did not finish within {timeout}s') from None
+
+
+async def agenerate(prompt, model, timeout=None):
+    """
+    Async LLM call. Uses the client's agenerate() when it has one, otherwise
+    runs generate() in a worker thread; either way at most
+    AI_MAX_CONCURRENT_CALLS are in flight and the rest wait on the loop.
+    The call is cancelled after `timeout` seconds, as clients may ignore it.
+    """
+    client = get_llm_client()
+    async with upstream_slot():
+        if hasattr(client, 'agenerate'):
+            call = client.agenerate(prompt, model=model, timeout=timeout)
+        else:
+            call = sync_to_async(client.generate, thread_sensitive=False)(prompt, model=model, timeout=timeout)
+        try:
+            return await asyncio.wait_for(call, timeout or None)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f'LLM call did not finish within {timeout}s') from None
+
+
+# ===============================
+# Organizer: Suggest Mission
+# ===============================
+def build_suggest_prompt(event, team_members_usernames):
+    team_members_str = ', '.join(team_members_usernames) if team_members_usernames else 'No members'
+    return f"""
+        You are a professional AI event planner. Your task is to create ONE realistic and actionable mission
+        for this event, suitable to be assigned to the team manager. Consider the event details:
+
+        - Event Title: {event.title}
+        - Event Date: {event.date}
+        - Event Location: {event.location}
+        - Event Type: {event.event_type if hasattr(event, 'event_type') else 'General'}
+        - Expected Attendees: {event.expected_attendees if hasattr(event, 'expected_attendees') else 'Unknown'}
+        - Available Team Members: {team_members_str}
+
+        Requirements:
+        - Must be actionable and assignable to a manager.
+        - Include a clear title (short, descriptive).
+        - Include a description (1-2 sentences) explaining what needs to be done and why.
+        - Consider potential challenges.
+
+        Return ONLY a JSON in this exact format:
+        {{
+          "title": "short descriptive title",
+          "description": "1-2 sentence explanation of the mission"
+        }}
+        """
+
+
+def parse_suggestion(text):
+    """Extract the {"title", "description"} object from the model's reply."""
+    text = text.strip()
+    start = text.find('{')
+    end = text.rfind('}') + 1
+    if start == -1 or end == 0:
+        raise ValueError('No JSON found in AI response')
+    suggestion = json.loads(text[start:end])
+    if 'title' not in suggestion or 'description' not in suggestion:
+        raise ValueError('AI response is missing title or description')
+    return suggestion
+
+
+def suggest_mission(event, team_members_usernames, timeout=None):
+    prompt = build_suggest_prompt(event, team_members_usernames)
+    text = ai_cache.get_response(event.id, settings.AI_MODEL, prompt)
+    if text is None:
+        with span('ai'):
+            text = generate(prompt, model=settings.AI_MODEL, timeout=timeout)
+        suggestion = parse_suggestion(text)
+        # only cache replies that parsed, so a bad answer is retried next time
+        ai_cache.set_response(event.id, settings.AI_MODEL, prompt, text)
+        return suggestion
+    return parse_suggestion(text)
+
+
+async def asuggest_mission(event, team_members_usernames, timeout=None):
+    """suggest_mission for async callers: same cache, awaited LLM call."""
+    prompt = build_suggest_prompt(event, team_members_usernames)
+    text = await sync_to_async(ai_cache.get_response)(event.id, settings.AI_MODEL, prompt)
+    if text is None:
+        with span('ai'):
+            text = await agenerate(prompt, model=settings.AI_MODEL, timeout=timeout)
+        suggestion = parse_suggestion(text)
+        await sync_to_async(ai_cache.set_response)(event.id, settings.AI_MODEL, prompt, text)
+        return suggestion
+    return parse_suggestion(text)
+
+
+# ===============================
+# Manager: Dynamic Split Mission
+# ===============================
+def split_mission(title, description, team_members, workloads=None):
+    """
+    Dynamically split a mission into subtasks and assign them to team members.
+    team_members: QuerySet of UserProfile objects
+    workloads: open task counts per profile id (workload.get_workloads)
+    """
+    subtasks = []
+    available = [member for member in team_members if member.role == 'staff' and member.is_available]
+
+    # As many subtasks as available staff, each given to whoever is least loaded at
+    # that point: a lightly loaded member can get several, a busy one none
+    for i, member in enumerate(pick_assignees(available, len(available), workloads or {}), start=1):
+        task_title = f"{title} - Subtask {i}"
+        task_description = f"Task for {member.user.username}: {description[:50]}..."  # Short preview
+        subtasks.append({
+            "title": task_title,
+            "description": task_description,
+            "assignee": member.user.username
+        })
+
+    return subtasks
@@ -0,0 +1,140 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import JsonResponse
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed as DRFAuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+# ===============================
+# JWT auth that loads the profile with the user
+# ===============================
+class ProfileJWTAuthentication(JWTAuthentication):
+    """
+    Same checks as JWTAuthentication.get_user, but the User is fetched with
+    select_related('userprofile') so request.profile costs no extra query.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken('Token contained no recognizable user identification') from e
+
+        try:
+            user = self.user_model.objects.select_related('userprofile').get(
+                **{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed('User not found', code='user_not_found') from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+
+        return user
+
+
+# ===============================
+# request.profile
+# ===============================
+def get_profile(user):
+    """Profile of an authenticated user; reuses the select_related cache when present."""
+    return user.userprofile
+
+
+class ProfileMiddleware:
+    """
+    Attach `request.profile`, resolved lazily on first access. DRF sets the
+    authenticated user on the underlying HttpRequest, so by the time a view
+    reads request.profile it refers to the JWT user.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.profile = SimpleLazyObject(lambda: get_profile(request.user))
+        return self.get_response(request)  # a coroutine in an async chain
+
+
+# ===============================
+# Async views (plain Django, outside DRF)
+# ===============================
+def jwt_required(view):
+    """
+    Authenticate an async view with ProfileJWTAuthentication, as DRF would
+    for IsAuthenticated: 401 without a valid token, otherwise request.user
+    (with its profile) is set. CSRF-exempt like DRF's APIView.
+    """
+    authenticate = sync_to_async(ProfileJWTAuthentication().authenticate)
+
+    @csrf_exempt
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await authenticate(request)
+        except DRFAuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            return JsonResponse(detail, status=401)
+        if result is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        request.user = result[0]
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+# ===============================
+# Stream tickets (EventSource can't send an Authorization header)
+# ===============================
+# A short-lived signed user id, so the access JWT never ends up in a URL,
+# and so never in proxy or gunicorn access logs.
+TICKET_SALT = 'main_app.stream-ticket'
+
+
+def issue_stream_ticket(user):
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+def user_for_ticket(ticket):
+    """The active user a ticket was issued to, or None if it is forged or older than PUSH_TICKET_TTL."""
+    try:
+        user_id = signing.TimestampSigner(salt=TICKET_SALT).unsign(ticket, max_age=settings.PUSH_TICKET_TTL)
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.select_related('userprofile').filter(pk=user_id, is_active=True).first()
+
+
+def stream_ticket_required(view):
+    """
+    Like jwt_required, but a valid `?ticket=` (issue_stream_ticket) is
+    accepted in place of the Authorization header.
+    """
+    jwt_view = jwt_required(view)
+
+    @csrf_exempt
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        ticket = request.GET.get('ticket')
+        if ticket is None:
+            return await jwt_view(request, *args, **kwargs)
+        user = await sync_to_async(user_for_ticket)(ticket)
+        if user is None:
+            return JsonResponse({'detail': 'Invalid or expired stream ticket'}, status=401)
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
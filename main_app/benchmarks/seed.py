@@ -0,0 +1,90 @@
+import itertools
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from ..models import UserProfile, Company, Event, Team, Mission, Task, TASK_STATUS_CHOICES
+
+BATCH_SIZE = 2000
+PASSWORD = 'bench-pass-123'
+
+
+def _create_profiles(prefix, count, role, password_hash):
+    users = User.objects.bulk_create(
+        [User(username=f'{prefix}_{i}', password=password_hash) for i in range(count)],
+        batch_size=BATCH_SIZE
+    )
+    return UserProfile.objects.bulk_create(
+        [UserProfile(user=user, role=role, username=user.username) for user in users],
+        batch_size=BATCH_SIZE
+    )
+
+
+def seed(companies=2, events_per_company=5, teams_per_event=4, members_per_team=25,
+         missions_per_team=5, tasks_per_mission=10, prefix='bench'):
+    """
+    Insert a synthetic tenant with bulk_create and return the ids benchmarks
+    need (one profile per role). Total tasks =
+    companies * events_per_company * teams_per_event * missions_per_team * tasks_per_mission.
+    All users share the password PASSWORD.
+    """
+    password_hash = make_password(PASSWORD)
+    admin, = _create_profiles(f'{prefix}_admin', 1, 'admin', password_hash)
+    organizer, = _create_profiles(f'{prefix}_organizer', 1, 'organizer', password_hash)
+
+    company_objs = Company.objects.bulk_create(
+        [Company(name=f'{prefix} company {i}', created_by=admin) for i in range(companies)]
+    )
+    event_objs = Event.objects.bulk_create([
+        Event(title=f'{prefix} event {c.id}-{i}', date=date.today() + timedelta(days=i),
+              company=c, created_by=organizer)
+        for c in company_objs for i in range(events_per_company)
+    ], batch_size=BATCH_SIZE)
+
+    team_count = len(event_objs) * teams_per_event
+    managers = _create_profiles(f'{prefix}_manager', team_count, 'manager', password_hash)
+    staff = _create_profiles(f'{prefix}_staff', team_count * members_per_team, 'staff', password_hash)
+
+    team_objs = Team.objects.bulk_create([
+        Team(name=f'{prefix} team {i}', event=event_objs[i // teams_per_event],
+             manager=managers[i], created_by=organizer)
+        for i in range(team_count)
+    ], batch_size=BATCH_SIZE)
+
+    Membership = Team.members.through
+    Membership.objects.bulk_create([
+        Membership(team_id=team.id, userprofile_id=staff[t * members_per_team + m].id)
+        for t, team in enumerate(team_objs) for m in range(members_per_team)
+    ], batch_size=BATCH_SIZE)
+
+    mission_objs = Mission.objects.bulk_create([
+        Mission(title=f'{prefix} mission {team.id}-{i}', event_id=team.event_id, team=team,
+                created_by=organizer, assigned_manager_id=team.manager_id)
+        for team in team_objs for i in range(missions_per_team)
+    ], batch_size=BATCH_SIZE)
+
+    statuses = itertools.cycle([value for value, _ in TASK_STATUS_CHOICES])
+    team_index = {team.id: t for t, team in enumerate(team_objs)}
+    tasks = (
+        Task(title=f'{prefix} task {mission.id}-{i}', mission=mission, team_id=mission.team_id,
+             event_id=mission.event_id, created_by=organizer, status=next(statuses),
+             assignee=staff[team_index[mission.team_id] * members_per_team + i % members_per_team],
+             ai_generated=i % 2 == 0)
+        for mission in mission_objs for i in range(tasks_per_mission)
+    )
+    while True:
+        batch = list(itertools.islice(tasks, BATCH_SIZE))
+        if not batch:
+            break
+        Task.objects.bulk_create(batch)
+
+    return {
+        'admin': admin.id,
+        'organizer': organizer.id,
+        'manager': managers[0].id,
+        'staff': staff[0].id,
+        'event': event_objs[0].id,
+        'team': team_objs[0].id,
+        'mission': mission_objs[0].id,
+    }
@@ -0,0 +1,136 @@
+import asyncio
+import itertools
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Put on a subscriber's queue in place of its backlog when it falls behind
+OVERFLOW = object()
+
+
+# ===============================
+# Subscriptions
+# ===============================
+class Subscription:
+    """
+    One consumer: a bounded asyncio queue on the consumer's event loop plus
+    the topics it listens to. Publishers may call deliver() from any thread.
+    """
+
+    def __init__(self, topics, loop, maxsize):
+        self.topics = frozenset(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Backpressure: a slow consumer doesn't grow memory or hold up the
+            # publisher. Drop its backlog and tell it to resync instead.
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+    async def get(self, timeout=None):
+        """Next message, OVERFLOW, or None after `timeout` seconds of silence."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+# ===============================
+# Backends
+# ===============================
+class InProcessBroker:
+    """
+    Fan-out inside one process: fine for a single worker and for tests. With
+    several workers every process needs to see every publish, so plug in a
+    backend with the same three methods over Redis/Postgres pub/sub.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, topics):
+        subscription = Subscription(topics, asyncio.get_running_loop(), settings.PUSH_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, topics, message):
+        """Deliver `message` once to every subscription listening on any of `topics`."""
+        topics = set(topics)
+        message = {'id': next(self._ids), **message}
+        with self._lock:
+            targets = [s for s in self._subscriptions if s.topics & topics]
+        for subscription in targets:
+            try:
+                subscription.deliver(message)
+            except RuntimeError:  # the subscriber's loop has closed
+                self.unsubscribe(subscription)
+        return len(targets)
+
+
+BROKER_BACKENDS = {
+    'memory': InProcessBroker,
+}
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The PUSH_BROKER_BACKEND broker: a key of BROKER_BACKENDS or a dotted class path."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = settings.PUSH_BROKER_BACKEND
+                _broker = (BROKER_BACKENDS.get(backend) or import_string(backend))()
+    return _broker
+
+
+def set_broker(broker):
+    """Swap the process-wide broker (tests install a fresh one)."""
+    global _broker
+    _broker = broker
+
+
+# ===============================
+# Topics
+# ===============================
+# Mirror the list scoping in views.py: visible_tasks / visible_missions
+def task_topics(task):
+    return ['all', f'team-tasks:{task.team_id}', f'assignee:{task.assignee_id}']
+
+
+def mission_topics(mission):
+    return ['all', f'team-missions:{mission.team_id}']
+
+
+def subscriber_topics(profile, access_index):
+    if profile.role == 'organizer':
+        return {'all'}
+    topics = {f'assignee:{profile.id}'}
+    if profile.role == 'manager':
+        topics |= {f'team-tasks:{team_id}' for team_id in access_index.managed_team_ids}
+        topics |= {f'team-missions:{team_id}' for team_id in access_index.managed_team_ids}
+    elif profile.role == 'staff':
+        topics |= {f'team-missions:{team_id}' for team_id in access_index.member_team_ids}
+    return topics
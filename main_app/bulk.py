@@ -0,0 +1,278 @@
+import codecs
+import csv
+import io
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import ai_cache, response_cache, rollups, workload
+from .models import Team
+from .pagination import STREAM_CHUNK_SIZE
+from .permissions import invalidate_access_index
+from .serializers import BulkEventSerializer, BulkMissionSerializer, BulkTaskSerializer, BulkTeamSerializer
+
+
+# ===============================
+# Bulk import / export of events, teams, missions and tasks
+# ===============================
+# One row per object, NDJSON or CSV, with a `type` column. Fields are those
+# of the regular serializers. FKs take an existing id, or the `ref` of a row
+# earlier in the same import, e.g.
+#   {"type": "event", "ref": "expo", "title": "AI Expo", "date": "2030-01-01"}
+#   {"type": "team", "ref": "tech", "name": "Tech", "event": "expo", "members": [4, 7]}
+#   {"type": "task", "title": "Badges", "event": "expo", "team": "tech"}
+# Rows are read, validated and inserted BULK_BATCH_SIZE at a time, each
+# chunk in its own transaction, so memory stays flat with file size.
+
+# Dependency order: within a chunk, events are inserted before the teams that
+# reference them, and so on.
+SERIALIZERS = {
+    'event': BulkEventSerializer,
+    'team': BulkTeamSerializer,
+    'mission': BulkMissionSerializer,
+    'task': BulkTaskSerializer,
+}
+FORMATS = ('ndjson', 'csv')
+
+# CSV cells holding id lists, separated by ';'
+CSV_LIST_FIELDS = ('members',)
+CSV_LIST_SEPARATOR = ';'
+
+# Export filter for ?event=<id>
+EVENT_LOOKUPS = {'event': 'id', 'team': 'event_id', 'mission': 'event_id', 'task': 'event_id'}
+
+
+def parse_types(value):
+    """'team,task' -> ['team', 'task'] in dependency order; ValueError on unknown types."""
+    types = {kind.strip() for kind in value.split(',') if kind.strip()} if value else set(SERIALIZERS)
+    unknown = types - set(SERIALIZERS)
+    if unknown:
+        raise ValueError(f'Unknown type(s): {", ".join(sorted(unknown))}; use {", ".join(SERIALIZERS)}')
+    return [kind for kind in SERIALIZERS if kind in types]
+
+
+def related_fields(model):
+    return [
+        (field.name, field.related_model) for field in model._meta.get_fields()
+        if (field.many_to_one or field.many_to_many) and not field.auto_created
+    ]
+
+
+# ===============================
+# Reading
+# ===============================
+# Both readers take an iterable of byte lines (an open file or the request)
+# and yield (line number, row dict or None when the line is not an object).
+def read_ndjson(lines):
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_no, row if isinstance(row, dict) else None
+
+
+def read_csv(lines):
+    reader = csv.DictReader(codecs.iterdecode(lines, 'utf-8'))
+    for row in reader:
+        # blank cells mean "not given", so serializer defaults apply
+        row = {key: value for key, value in row.items() if key and value not in ('', None)}
+        for key in CSV_LIST_FIELDS:
+            if key in row:
+                row[key] = [item.strip() for item in row[key].split(CSV_LIST_SEPARATOR) if item.strip()]
+        yield reader.line_num, row
+
+
+READERS = {'ndjson': read_ndjson, 'csv': read_csv}
+
+
+# ===============================
+# Import
+# ===============================
+class Importer:
+    """
+    Validate rows with the Bulk* serializers and insert them with bulk_create.
+    Invalid rows are skipped and reported; they never abort the import.
+    `run()` returns {"created": {type: count}, "errors": [row errors]}.
+    """
+
+    def __init__(self, profile=None, default_type=None, batch_size=None):
+        self.profile = profile
+        self.default_type = default_type
+        self.batch_size = batch_size or settings.BULK_BATCH_SIZE
+        self.refs = {}  # (model, ref) -> inserted object
+        self.created = dict.fromkeys(SERIALIZERS, 0)
+        self.errors = []
+        self.team_event_ids = set()
+        self.rollup_event_ids = set()
+        self.assignee_ids = set()
+        self.team_profile_ids = set()
+
+    def run(self, rows):
+        rows = iter(rows)
+        try:
+            while True:
+                chunk = list(islice(rows, self.batch_size))
+                if not chunk:
+                    break
+                self.import_chunk(chunk)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            self.errors.append({'line': None, 'errors': f'Unreadable input: {exc}'})
+        finally:
+            self.invalidate_caches()
+        return {'created': self.created, 'errors': self.errors}
+
+    def error(self, line_no, kind, ref, errors):
+        self.errors.append({'line': line_no, 'type': kind, 'ref': ref, 'errors': errors})
+
+    def import_chunk(self, chunk):
+        by_type = {kind: [] for kind in SERIALIZERS}
+        for line_no, row in chunk:
+            if row is None:
+                self.error(line_no, None, None, 'Not a JSON object')
+                continue
+            kind = row.pop('type', None) or self.default_type
+            if kind not in by_type:
+                self.error(line_no, kind, row.get('ref'), {'type': [f'Must be one of {", ".join(SERIALIZERS)}']})
+                continue
+            by_type[kind].append((line_no, row))
+
+        context = {'refs': self.refs, 'objects': self.load_related(by_type)}
+        with transaction.atomic():
+            for kind, rows in by_type.items():
+                if rows:
+                    self.save_rows(kind, rows, context)
+
+    def load_related(self, by_type):
+        """One in_bulk() per related model for every plain id in the chunk."""
+        ids = defaultdict(set)
+        for kind, rows in by_type.items():
+            for name, model in related_fields(SERIALIZERS[kind].Meta.model):
+                for _, row in rows:
+                    values = row.get(name)
+                    for value in values if isinstance(values, list) else [values]:
+                        if isinstance(value, int) and not isinstance(value, bool):
+                            ids[model].add(value)
+                        elif isinstance(value, str) and value.isdigit():
+                            ids[model].add(int(value))
+        return {model: model._default_manager.in_bulk(pks) for model, pks in ids.items()}
+
+    def check_ref(self, model, ref):
+        if ref is None:
+            return None
+        if not isinstance(ref, str) or not ref or ref.isdigit():
+            return 'A ref must be text that is not a number'
+        if (model, ref) in self.refs:
+            return 'Duplicate ref'
+        return None
+
+    def save_rows(self, kind, rows, context):
+        serializer_class = SERIALIZERS[kind]
+        model = serializer_class.Meta.model
+        # one serializer per chunk: building its fields costs more than validating a row
+        serializer = serializer_class(context=context)
+        pending = []  # (ref, object, members)
+        for line_no, row in rows:
+            ref = row.pop('ref', None)
+            try:
+                data, errors = dict(serializer.run_validation(row)), {}
+            except ValidationError as exc:
+                data, errors = None, dict(exc.detail)
+            ref_error = self.check_ref(model, ref)
+            if ref_error:
+                errors['ref'] = [ref_error]
+            if errors:
+                self.error(line_no, kind, ref, errors)
+                continue
+            members = data.pop('members', None) or []
+            data['created_by'] = self.profile
+            obj = model(**data)
+            if ref is not None:
+                self.refs[(model, ref)] = obj  # claimed now so later rows of the chunk can't reuse it
+            pending.append((ref, obj, members))
+
+        # the objects get their ids here, so refs to them resolve from now on
+        model.objects.bulk_create([obj for _, obj, _ in pending], batch_size=self.batch_size)
+        if kind == 'team':
+            self.save_members(pending)
+        elif kind in ('mission', 'task'):
+            self.rollup_event_ids |= {obj.event_id for _, obj, _ in pending}
+            if kind == 'task':
+                self.assignee_ids |= {obj.assignee_id for _, obj, _ in pending}
+        self.created[kind] += len(pending)
+
+    def save_members(self, pending):
+        through = Team.members.through
+        links = []
+        for _, team, members in pending:
+            member_ids = {member.id for member in members}
+            links += [through(team_id=team.id, userprofile_id=member_id) for member_id in member_ids]
+            self.team_event_ids.add(team.event_id)
+            self.team_profile_ids |= member_ids | {team.manager_id}
+        through.objects.bulk_create(links, batch_size=self.batch_size)
+
+    def invalidate_caches(self):
+        # bulk_create sends no post_save / m2m_changed, so do what signals.py would
+        if self.created['event']:
+            response_cache.invalidate('events')
+        for event_id in self.team_event_ids:
+            ai_cache.invalidate_event(event_id)
+        invalidate_access_index(*self.team_profile_ids)
+        rollups.invalidate(*self.rollup_event_ids)
+        workload.invalidate(*self.assignee_ids)
+
+
+def import_rows(lines, file_format='ndjson', **kwargs):
+    return Importer(**kwargs).run(READERS[file_format](lines))
+
+
+# ===============================
+# Export
+# ===============================
+def export_rows(types, event_id=None):
+    """Yield (type, serialized row) for each type in order, a DB chunk at a time."""
+    for kind in types:
+        serializer_class = SERIALIZERS[kind]
+        queryset = serializer_class.Meta.model.objects.all()
+        if event_id is not None:
+            queryset = queryset.filter(**{EVENT_LOOKUPS[kind]: event_id})
+        queryset = serializer_class.setup_eager_loading(queryset).order_by('id')
+        serializer = serializer_class()  # fields built once, not per row
+        for obj in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE):
+            yield kind, serializer.to_representation(obj)
+
+
+def write_ndjson(rows):
+    encoder = JSONEncoder()
+    for kind, data in rows:
+        yield encoder.encode({'type': kind, **data}) + '\n'
+
+
+def write_csv(rows, kind):
+    """CSV of a single type; list cells are joined with ';' as read_csv expects."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = list(SERIALIZERS[kind]().fields)
+    writer.writerow(['type'] + columns)
+    for _, data in rows:
+        writer.writerow([kind] + [csv_cell(data.get(column)) for column in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # header only: there were no rows
+        yield buffer.getvalue()
+
+
+def csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return CSV_LIST_SEPARATOR.join(str(item) for item in value)
+    return value
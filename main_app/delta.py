@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .models import Tombstone
+
+
+# ===============================
+# ?since=<cursor> delta sync
+# ===============================
+# The cursor is an opaque string (microseconds since the epoch). Each reply's
+# cursor sits DELTA_SYNC_LAG seconds behind the server clock. That covers a
+# row that got its updated_at before we queried but committed after, at the
+# cost of re-sending recent rows; clients upsert by id. `?since=0` is the
+# initial full sync.
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(moment):
+    return str((moment - EPOCH) // timedelta(microseconds=1))
+
+
+def decode_cursor(value):
+    try:
+        return EPOCH + timedelta(microseconds=int(value))
+    except (TypeError, ValueError, OverflowError):
+        raise ValidationError({'since': 'Invalid cursor'})
+
+
+def wants_delta(request):
+    return 'since' in request.query_params
+
+
+def delta_response(request, changed, tombstones, serializer_class):
+    """
+    Rows changed after the cursor plus ids deleted after it:
+        {"cursor": "...", "changed": [...], "deleted": [ids]}
+    `changed(since)` returns the scoped queryset of created/updated rows;
+    `tombstones` is the scoped Tombstone queryset for this model. Apply
+    `deleted` before `changed` (a reused id can appear in both).
+    """
+    now = timezone.now()
+    since = decode_cursor(request.query_params['since'])
+    if since > EPOCH and since < now - timedelta(days=settings.DELTA_SYNC_RETENTION_DAYS):
+        return Response({'error': 'Cursor expired; refetch the full list with ?since=0'}, status=410)
+
+    rows = list(serializer_class.setup_eager_loading(changed(since)).order_by('id'))
+    live_ids = {row.id for row in rows}
+    deleted = {
+        object_id
+        for object_id in tombstones.filter(deleted_at__gt=since).values_list('object_id', flat=True)
+        if object_id not in live_ids
+    } if since > EPOCH else set()
+
+    return Response({
+        'cursor': encode_cursor(now - timedelta(seconds=settings.DELTA_SYNC_LAG)),
+        'changed': serializer_class(rows, many=True).data,
+        'deleted': sorted(deleted),
+    })
+
+
+# ===============================
+# Tombstones
+# ===============================
+def record_deletes(tasks=None, missions=None, seen=None):
+    """
+    Bulk-insert tombstones for the task and mission querysets about to be
+    deleted. `seen` holds the (model, id) pairs already recorded by this
+    delete, so overlapping cascades write each row once. Returns the event
+    ids and assignee ids of the new rows, for cache invalidation.
+    """
+    seen = set() if seen is None else seen
+    tombstones, event_ids, assignee_ids = [], set(), set()
+    if tasks is not None:
+        for task_id, team_id, assignee_id, mission_id, event_id in tasks.values_list(
+                'id', 'team_id', 'assignee_id', 'mission_id', 'event_id'):
+            if ('task', task_id) not in seen:
+                seen.add(('task', task_id))
+                tombstones.append(Tombstone(model='task', object_id=task_id, team_id=team_id,
+                                            assignee_id=assignee_id, mission_id=mission_id))
+                event_ids.add(event_id)
+                assignee_ids.add(assignee_id)
+    if missions is not None:
+        for mission_id, team_id, event_id in missions.values_list('id', 'team_id', 'event_id'):
+            if ('mission', mission_id) not in seen:
+                seen.add(('mission', mission_id))
+                tombstones.append(Tombstone(model='mission', object_id=mission_id, team_id=team_id))
+                event_ids.add(event_id)
+    Tombstone.objects.bulk_create(tombstones, batch_size=settings.BULK_BATCH_SIZE)
+    return event_ids, assignee_ids
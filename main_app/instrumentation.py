@@ -0,0 +1,278 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Record of the request being handled on this thread/task, or None when the
+# request was not sampled (spans are then no-ops).
+_current = ContextVar('instrumentation_record', default=None)
+
+IN_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+DUPLICATE_SQL_PREVIEW = 300
+
+
+def fingerprint(sql):
+    """SQL with placeholders only; IN lists of any length collapse to one shape."""
+    return IN_LIST_RE.sub('(%s...)', sql)
+
+
+class RequestRecord:
+    def __init__(self):
+        self.query_count = 0
+        self.sql_ms = 0.0
+        self.spans = defaultdict(float)
+        self.span_depth = defaultdict(int)
+        self.fingerprints = Counter()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - start) * 1000
+            self.query_count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, limit=5):
+        return [
+            {'count': count, 'sql': sql[:DUPLICATE_SQL_PREVIEW]}
+            for sql, count in self.fingerprints.most_common(limit) if count > 1
+        ]
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper on every connection. It charges the query to the record
+    in _current, which sync_to_async copies into its threads, so ORM calls
+    of async views count although they run on other connections.
+    """
+    record = _current.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    return record.execute_wrapper(execute, sql, params, many, context)
+
+
+def install_query_wrapper(conn):
+    if record_query not in conn.execute_wrappers:
+        conn.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def wrap_new_connection(sender, **kwargs):
+    install_query_wrapper(kwargs['connection'])
+
+
+@contextmanager
+def span(name):
+    """
+    Add the wrapped block's duration to the current request under `name`.
+    Nested spans of the same name count once (e.g. nested serializers).
+    """
+    record = _current.get()
+    if record is None or record.span_depth[name]:
+        yield
+        return
+    record.span_depth[name] += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record.span_depth[name] -= 1
+        record.spans[name] += (time.perf_counter() - start) * 1000
+
+
+# ===============================
+# Aggregates for the admin endpoint
+# ===============================
+class Aggregator:
+    """Per-process totals by view and by duplicated query fingerprint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.views = defaultdict(lambda: {'requests': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                          'queries': 0, 'sql_ms': 0.0})
+        self.duplicates = defaultdict(lambda: {'requests': 0, 'max_repeats': 0, 'views': set()})
+
+    def add(self, entry, record):
+        with self.lock:
+            view = self.views[entry['view']]
+            view['requests'] += 1
+            view['total_ms'] += entry['total_ms']
+            view['max_ms'] = max(view['max_ms'], entry['total_ms'])
+            view['queries'] += entry['queries']
+            view['sql_ms'] += entry['sql_ms']
+            for sql, count in record.fingerprints.items():
+                if count > 1:
+                    dup = self.duplicates[sql]
+                    dup['requests'] += 1
+                    dup['max_repeats'] = max(dup['max_repeats'], count)
+                    dup['views'].add(entry['view'])
+
+    def report(self, limit=20):
+        with self.lock:
+            views = [
+                {
+                    'view': name,
+                    'requests': v['requests'],
+                    'avg_ms': round(v['total_ms'] / v['requests'], 3),
+                    'max_ms': round(v['max_ms'], 3),
+                    'avg_queries': round(v['queries'] / v['requests'], 1),
+                    'avg_sql_ms': round(v['sql_ms'] / v['requests'], 3),
+                }
+                for name, v in self.views.items()
+            ]
+            duplicates = [
+                {
+                    'sql': sql[:DUPLICATE_SQL_PREVIEW],
+                    'requests': d['requests'],
+                    'max_repeats': d['max_repeats'],
+                    'views': sorted(d['views']),
+                }
+                for sql, d in self.duplicates.items()
+            ]
+        views.sort(key=lambda v: v['avg_ms'], reverse=True)
+        duplicates.sort(key=lambda d: d['max_repeats'] * d['requests'], reverse=True)
+        return {'slowest_views': views[:limit], 'duplicate_queries': duplicates[:limit]}
+
+
+aggregator = Aggregator()
+
+
+# ===============================
+# Database connection / pool
+# ===============================
+def database_stats():
+    """Connection settings plus psycopg pool counters when a pool is configured."""
+    settings_dict = connection.settings_dict
+    stats = {
+        'vendor': connection.vendor,
+        'conn_max_age': settings_dict['CONN_MAX_AGE'],
+        'health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+        'pool': None,
+    }
+    pool = getattr(connection, 'pool', None)  # only the postgresql backend has one
+    if pool is not None:
+        counters = pool.get_stats()
+        requests = counters.get('requests_num', 0)
+        size = counters.get('pool_size', 0)
+        stats['pool'] = {
+            'min_size': pool.min_size,
+            'max_size': pool.max_size,
+            'size': size,
+            'in_use': size - counters.get('pool_available', 0),
+            'waiting': counters.get('requests_waiting', 0),
+            'checkouts': requests,
+            'queued_checkouts': counters.get('requests_queued', 0),
+            'avg_checkout_wait_ms': round(counters.get('requests_wait_ms', 0) / requests, 3) if requests else 0.0,
+            'checkout_errors': counters.get('requests_errors', 0),
+        }
+    return stats
+
+
+# ===============================
+# Middleware
+# ===============================
+class InstrumentationMiddleware:
+    """
+    For a sampled share of requests (INSTRUMENTATION_SAMPLE_RATE), record SQL
+    count/time, duplicate query shapes and serializer/AI spans; write them as
+    one JSON log line and feed the aggregator. The Server-Timing header only
+    goes to admins (or everyone under DEBUG), as it exposes query counts.
+    Works in sync and async chains, so ASGI requests stay on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def sampled():
+        rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        record = RequestRecord()
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, record, start)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        record = RequestRecord()
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, record, start)
+
+    @staticmethod
+    def shows_timings(request):
+        if settings.DEBUG:
+            return True
+        user = getattr(request, 'user', None)
+        # JWT auth loads the profile with the user; never query for it here,
+        # as this also runs on the event loop
+        if user is None or not user.is_authenticated or not User.userprofile.is_cached(user):
+            return False
+        return user.userprofile.role == 'admin'
+
+    def finish(self, request, response, record, start):
+        total_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        entry = {
+            'view': (match.view_name or match._func_path) if match else request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 3),
+            'queries': record.query_count,
+            'sql_ms': round(record.sql_ms, 3),
+            'serializer_ms': round(record.spans['serializer'], 3),
+            'ai_ms': round(record.spans['ai'], 3),
+            'duplicates': record.duplicates(),
+        }
+        aggregator.add(entry, record)
+        logger.info(json.dumps(entry))
+
+        if not self.shows_timings(request):
+            return response
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={entry["sql_ms"]};desc="{record.query_count} queries"',
+            f'serializer;dur={entry["serializer_ms"]}',
+            f'ai;dur={entry["ai_ms"]}',
+            f'total;dur={entry["total_ms"]}',
+        ])
+        return response
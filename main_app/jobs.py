@@ -0,0 +1,278 @@
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import AIJob, Event, Mission, UserProfile
+from .ai_service import suggest_mission, asuggest_mission
+
+logger = logging.getLogger(__name__)
+
+
+class JobError(Exception):
+    """Raised by a handler for failures that retrying will not fix."""
+
+
+# ===============================
+# Handlers (one per AIJob.kind)
+# ===============================
+def _team_manager(team):
+    if not team:
+        raise JobError('No team found for this event')
+    if not team.manager:
+        raise JobError('No manager assigned to the team')
+    return team.manager
+
+
+def _members_usernames(event):
+    return (
+        UserProfile.objects.filter(teams__event=event)
+        .order_by('teams__id', 'id')
+        .values_list('user__username', flat=True)
+    )
+
+
+def _mission_result(mission, manager):
+    return {
+        "mission": {
+            "id": mission.id,
+            "title": mission.title,
+            "description": mission.description,
+            "manager": manager.user.username
+        }
+    }
+
+
+def _save_suggestion(job, suggestion, event, team, manager):
+    """Create the mission and record it as the job's result in one transaction."""
+    with transaction.atomic():
+        mission = Mission.objects.create(
+            title=suggestion['title'],
+            description=suggestion['description'],
+            event=event,
+            team=team,
+            assigned_manager=manager,
+            created_by_id=job.created_by_id
+        )
+        job.result = _mission_result(mission, manager)
+        job.status = 'succeeded'
+        job.error = ''
+        job.save(update_fields=['status', 'result', 'error', 'updated_at'])
+    return job.result
+
+
+def handle_suggest_mission(job, timeout):
+    try:
+        event = Event.objects.get(id=job.payload['event'])
+    except Event.DoesNotExist:
+        raise JobError('Event not found')
+
+    team = event.teams.select_related('manager__user').order_by('id').first()
+    manager = _team_manager(team)
+    # only the LLM call is timed (ai_service.generate), and no transaction is open during it
+    suggestion = suggest_mission(event, list(_members_usernames(event)), timeout=timeout)
+    return _save_suggestion(job, suggestion, event, team, manager)
+
+
+async def ahandle_suggest_mission(job, timeout):
+    """Same as handle_suggest_mission, with async ORM calls and an awaited LLM call."""
+    try:
+        event = await Event.objects.aget(id=job.payload['event'])
+    except Event.DoesNotExist:
+        raise JobError('Event not found')
+
+    team = await event.teams.select_related('manager__user').order_by('id').afirst()
+    manager = _team_manager(team)
+    usernames = [username async for username in _members_usernames(event)]
+    # only the LLM call is timed (ai_service.agenerate), so a timeout can't
+    # interrupt the insert, which lands with the job's result or not at all
+    suggestion = await asuggest_mission(event, usernames, timeout=timeout)
+    return await sync_to_async(_save_suggestion)(job, suggestion, event, team, manager)
+
+
+JOB_HANDLERS = {
+    'suggest_mission': handle_suggest_mission,
+}
+
+ASYNC_JOB_HANDLERS = {
+    'suggest_mission': ahandle_suggest_mission,
+}
+
+
+# ===============================
+# Runner
+# ===============================
+def _retry_delay(job, error, max_attempts):
+    """
+    Record a transient failure. Returns the backoff before the next attempt,
+    or None once the attempts are used up (the job is then failed).
+    """
+    logger.warning('AI job %s attempt %s failed: %s', job.id, job.attempts, error)
+    job.error = str(error)
+    if job.attempts >= max_attempts:
+        job.status = 'failed'
+        return None
+    return settings.AI_JOB_BACKOFF * (2 ** (job.attempts - 1))
+
+
+def run_job(job_id):
+    """
+    Execute one job: up to AI_JOB_MAX_RETRIES attempts with exponential
+    backoff. JobError fails immediately; anything else is treated as transient.
+    The LLM call of each attempt is cut off after AI_JOB_TIMEOUT
+    (ai_service.generate), whether or not the client honours it. Handlers
+    save their rows together with the job's result.
+    """
+    job = AIJob.objects.select_related('created_by').get(id=job_id)
+    handler = JOB_HANDLERS[job.kind]
+    max_attempts = settings.AI_JOB_MAX_RETRIES + 1
+
+    while True:
+        job.attempts += 1
+        job.status = 'running'
+        job.save(update_fields=['attempts', 'status', 'updated_at'])
+        try:
+            job.result = handler(job, timeout=settings.AI_JOB_TIMEOUT)
+            job.status = 'succeeded'
+            job.error = ''
+            break
+        except JobError as e:
+            job.status = 'failed'
+            job.error = str(e)
+            break
+        except Exception as e:
+            delay = _retry_delay(job, e, max_attempts)
+            if delay is None:
+                break
+            time.sleep(delay)
+
+    job.save(update_fields=['status', 'result', 'error', 'updated_at'])
+    return job
+
+
+async def arun_job(job_id):
+    """
+    run_job on the event loop: the LLM wait and the backoff sleeps hold no
+    thread. As in run_job, only the LLM call is timed (ai_service.agenerate).
+    """
+    job = await AIJob.objects.aget(id=job_id)
+    handler = ASYNC_JOB_HANDLERS[job.kind]
+    max_attempts = settings.AI_JOB_MAX_RETRIES + 1
+
+    while True:
+        job.attempts += 1
+        job.status = 'running'
+        await job.asave(update_fields=['attempts', 'status', 'updated_at'])
+        try:
+            job.result = await handler(job, timeout=settings.AI_JOB_TIMEOUT)
+            job.status = 'succeeded'
+            job.error = ''
+            break
+        except JobError as e:
+            job.status = 'failed'
+            job.error = str(e)
+            break
+        except Exception as e:
+            delay = _retry_delay(job, e, max_attempts)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+
+    await job.asave(update_fields=['status', 'result', 'error', 'updated_at'])
+    return job
+
+
+# ===============================
+# Jobs orphaned by a stopped process
+# ===============================
+# Jobs live in this process only (thread pool or loop task). When a worker
+# exits (max_requests recycling, deploys) its queued and running jobs would
+# stay that way forever; they are failed once no attempt can still be alive.
+STALE_JOB_ERROR = 'The worker running this job stopped; please retry'
+
+
+def stale_after():
+    """Seconds after which a queued/running job has outlived every attempt, backoff and AI_JOB_STALE_GRACE."""
+    attempts = settings.AI_JOB_MAX_RETRIES + 1
+    backoff = sum(settings.AI_JOB_BACKOFF * 2 ** i for i in range(attempts - 1))
+    return attempts * settings.AI_JOB_TIMEOUT + backoff + settings.AI_JOB_STALE_GRACE
+
+
+def fail_stale_jobs(jobs=None):
+    """Fail the queued/running jobs in `jobs` (default: all) not updated for stale_after(); returns how many."""
+    now = timezone.now()
+    jobs = AIJob.objects.all() if jobs is None else jobs
+    return jobs.filter(
+        status__in=('queued', 'running'), updated_at__lt=now - timedelta(seconds=stale_after())
+    ).update(status='failed', error=STALE_JOB_ERROR, updated_at=now)
+
+
+def _run_in_worker(job_id):
+    try:
+        run_job(job_id)
+    except Exception:
+        logger.exception('AI job %s crashed', job_id)
+    finally:
+        close_old_connections()
+
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.AI_JOB_WORKERS, thread_name_prefix='ai-job'
+        )
+    return _executor
+
+
+def enqueue(job):
+    """
+    Hand a saved job to the worker pool once the creating transaction commits.
+    With AI_JOBS_EAGER the job runs inline (tests, management commands).
+    """
+    if settings.AI_JOBS_EAGER:
+        return run_job(job.id)
+    transaction.on_commit(lambda: get_executor().submit(_run_in_worker, job.id))
+    return job
+
+
+# Strong references to running loop tasks; asyncio only keeps weak ones
+_loop_tasks = set()
+
+
+async def _run_on_loop(job_id):
+    try:
+        await arun_job(job_id)
+    except Exception:
+        logger.exception('AI job %s crashed', job_id)
+    finally:
+        await sync_to_async(close_old_connections)()
+
+
+async def aenqueue(job):
+    """
+    enqueue for async views. Under SERVER_MODE=asgi the job becomes a task on
+    the server's event loop (capped by AI_MAX_CONCURRENT_CALLS, not by
+    threads); under WSGI the per-request loop dies with the response, so the
+    job goes to the thread pool as before.
+    """
+    if settings.AI_JOBS_EAGER:
+        return await arun_job(job.id)
+    if settings.SERVER_MODE == 'asgi':
+        # A fresh context so the task doesn't share the request's DB connection
+        # (create_task copies the current one; its context= needs Python 3.11)
+        task = contextvars.Context().run(asyncio.get_running_loop().create_task, _run_on_loop(job.id))
+        _loop_tasks.add(task)
+        task.add_done_callback(_loop_tasks.discard)
+        return job
+    return await sync_to_async(enqueue)(job)
@@ -0,0 +1,261 @@
+import itertools
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from main_app.ai_service import FakeLLMClient, set_llm_client
+from main_app.benchmarks.seed import PASSWORD, seed
+from main_app.benchmarks.stats import summarize_ms
+from main_app.models import UserProfile, Company, Event, Team, Mission, Task, AIJob
+
+
+# ===============================
+# Throwaway rows for destructive routes (created untimed)
+# ===============================
+def _throwaway_event(ids, n):
+    event = Event.objects.create(title=f'bench tmp event {n}', date=date.today())
+    return {'pk': event.id}
+
+
+def _throwaway_team(ids, n):
+    team = Team.objects.create(name=f'bench tmp team {n}', event_id=ids['event'],
+                               created_by_id=ids['organizer'])
+    return {'pk': team.id}
+
+
+def _throwaway_task(ids, n):
+    task = Task.objects.create(title=f'bench tmp task {n}', event_id=ids['event'],
+                               team_id=ids['team'], assignee_id=ids['staff'])
+    return {'pk': task.id}
+
+
+def _throwaway_mission(ids, n):
+    mission = Mission.objects.create(title=f'bench tmp mission {n}', event_id=ids['event'],
+                                     team_id=ids['team'], assigned_manager_id=ids['manager'])
+    return {'pk': mission.id}
+
+
+def _ai_tasks(ids, n):
+    mission = Mission.objects.get(id=_throwaway_mission(ids, n)['pk'])
+    task = Task.objects.create(title=f'bench tmp ai task {n}', mission=mission, event_id=ids['event'],
+                               team_id=ids['team'], assignee_id=ids['staff'], ai_generated=True)
+    return {'pk': mission.id, 'task': task.id}
+
+
+def build_routes(ids):
+    """
+    One entry per route in main_app/urls.py (several for role-scoped lists):
+    (name, role, method, path, data, setup). `path` and `data` are formatted
+    with ids, the iteration number `n` and whatever `setup` returns.
+    """
+    return [
+        ('signup', None, 'post', '/signup/',
+         {'username': 'bench_signup_{n}', 'email': 'signup{n}@bench.test', 'password': PASSWORD}, None),
+        ('login', None, 'post', '/login/', {'username': '{staff_username}', 'password': PASSWORD}, None),
+        ('verify', 'staff', 'get', '/verify/', None, None),
+        ('token_refresh', None, 'post', '/token/refresh/', {'refresh': '{staff_refresh}'}, None),
+
+        ('profiles_list', 'staff', 'get', '/profiles/', None, None),
+        ('profile_role_update', 'admin', 'patch', '/profiles/{staff}/', {'role': 'staff'}, None),
+        ('profile_me', 'staff', 'get', '/profiles/me/', None, None),
+
+        ('companies_list', 'organizer', 'get', '/companies/', None, None),
+        ('companies_create', 'organizer', 'post', '/companies/', {'name': 'bench tmp company {n}'}, None),
+        ('company_detail', 'organizer', 'get', '/companies/{company}/', None, None),
+        ('company_update', 'organizer', 'patch', '/companies/{company}/', {'name': 'bench company {n}'}, None),
+
+        ('events_list', 'organizer', 'get', '/events/', None, None),
+        ('events_create', 'organizer', 'post', '/events/', {'title': 'bench tmp', 'date': '2030-01-01'}, None),
+        ('event_detail', 'organizer', 'get', '/events/{event}/', None, None),
+        ('event_stats', 'organizer', 'get', '/events/{event}/stats/', None, None),
+        ('event_update', 'organizer', 'patch', '/events/{event}/', {'location': 'Riyadh'}, None),
+        ('event_delete', 'organizer', 'delete', '/events/{pk}/', None, _throwaway_event),
+
+        ('teams_list', 'organizer', 'get', '/teams/', None, None),
+        ('teams_create', 'organizer', 'post', '/teams/', {'name': 'bench tmp', 'event': '{event}'}, None),
+        ('team_detail', 'organizer', 'get', '/teams/{team}/', None, None),
+        ('team_update', 'organizer', 'patch', '/teams/{team}/', {'name': 'bench team'}, None),
+        ('team_delete', 'organizer', 'delete', '/teams/{pk}/', None, _throwaway_team),
+        ('team_add_member', 'organizer', 'post', '/teams/{team}/add-member/', {'member_id': '{staff}'}, None),
+        ('team_members_bulk', 'organizer', 'patch', '/teams/{team}/members/',
+         {'add': ['{staff}', '{manager}'], 'remove': []}, None),
+        ('team_workload', 'manager', 'get', '/teams/{team}/workload/', None, None),
+        ('team_delete_legacy', 'organizer', 'delete', '/teams/{pk}/delete/', None, _throwaway_team),
+
+        ('tasks_list_organizer', 'organizer', 'get', '/tasks/', None, None),
+        ('tasks_list_manager', 'manager', 'get', '/tasks/', None, None),
+        ('tasks_list_staff', 'staff', 'get', '/tasks/', None, None),
+        ('tasks_create', 'organizer', 'post', '/tasks/', {'title': 'bench tmp', 'event': '{event}'}, None),
+        ('task_detail', 'staff', 'get', '/tasks/{pk}/', None, _throwaway_task),
+        ('task_update', 'manager', 'patch', '/tasks/{pk}/', {'title': 'bench edit'}, _throwaway_task),
+        ('task_delete', 'manager', 'delete', '/tasks/{pk}/', None, _throwaway_task),
+        ('task_update_status', 'staff', 'patch', '/tasks/{pk}/update-status/', {'status': 'done'}, _throwaway_task),
+        ('task_events_ticket', 'staff', 'post', '/tasks/events/ticket/', None, None),
+        ('task_events', 'staff', 'get', '/tasks/events/', None, None),
+
+        ('missions_list_organizer', 'organizer', 'get', '/missions/', None, None),
+        ('missions_list_manager', 'manager', 'get', '/missions/', None, None),
+        ('missions_list_staff', 'staff', 'get', '/missions/', None, None),
+        ('missions_create', 'organizer', 'post', '/missions/',
+         {'title': 'bench tmp', 'event': '{event}', 'team': '{team}'}, None),
+        ('mission_detail', 'organizer', 'get', '/missions/{mission}/', None, None),
+        ('mission_update', 'organizer', 'patch', '/missions/{mission}/', {'description': 'bench'}, None),
+        ('mission_delete', 'organizer', 'delete', '/missions/{pk}/', None, _throwaway_mission),
+        ('mission_delete_legacy', 'organizer', 'delete', '/missions/{pk}/delete/', None, _throwaway_mission),
+
+        ('bulk_import', 'organizer', 'post', '/bulk/import/?type=task',
+         {'title': 'bench tmp', 'event': '{event}', 'team': '{team}'}, None),
+        ('bulk_export_event', 'organizer', 'get', '/bulk/export/?event={event}', None, None),
+
+        ('ai_suggest_mission', 'organizer', 'post', '/ai/suggest-mission/', {'event': '{event}'}, None),
+        ('ai_job_detail', 'organizer', 'get', '/ai/jobs/{job}/', None, None),
+        ('ai_cache_stats', 'admin', 'get', '/ai/cache/stats/', None, None),
+        ('ai_split_mission', 'manager', 'post', '/missions/{pk}/ai-split/', None, _throwaway_mission),
+        ('mission_approve', 'manager', 'patch', '/missions/{pk}/approve/',
+         {'updates': [{'id': '{task}', 'title': 'approved'}]}, _ai_tasks),
+
+        ('instrumentation', 'admin', 'get', '/instrumentation/', None, None),
+    ]
+
+
+# Routes that answer in-process requests with something other than 2xx. The
+# test client is WSGI, and the SSE stream refuses WSGI after authenticating,
+# so this times the auth and the refusal, not the stream.
+EXPECTED_STATUS = {
+    'task_events': 501,
+}
+
+
+def _format(value, ctx):
+    if isinstance(value, str):
+        formatted = value.format(**ctx)
+        return int(formatted) if formatted.isdigit() and value != formatted else formatted
+    if isinstance(value, dict):
+        return {k: _format(v, ctx) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_format(v, ctx) for v in value]
+    return value
+
+
+def _body_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic tenant, call every API route in-process with each '
+        "role's JWT and print p50/p95/p99 latency, queries and bytes per route "
+        'as JSON. Everything runs in one transaction that is rolled back; the '
+        'AI endpoints use FakeLLMClient.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=1)
+        parser.add_argument('--events', type=int, default=5, help='Events per company')
+        parser.add_argument('--teams', type=int, default=4, help='Teams per event')
+        parser.add_argument('--members', type=int, default=25, help='Members per team')
+        parser.add_argument('--missions', type=int, default=5, help='Missions per team')
+        parser.add_argument('--tasks', type=int, default=10, help='Tasks per mission')
+        parser.add_argument('--iterations', type=int, default=20, help='Requests per route')
+        parser.add_argument('--routes', help='Comma-separated route names to run (default: all)')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        set_llm_client(FakeLLMClient())
+        settings_override = override_settings(
+            ALLOWED_HOSTS=['testserver'], AI_JOBS_EAGER=True, AI_JOB_BACKOFF=0)
+        try:
+            with settings_override, transaction.atomic():
+                report = self.run(options)
+                transaction.set_rollback(True)
+        finally:
+            set_llm_client(None)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def run(self, options):
+        seed_start = time.perf_counter()
+        ids = seed(
+            companies=options['companies'], events_per_company=options['events'],
+            teams_per_event=options['teams'], members_per_team=options['members'],
+            missions_per_team=options['missions'], tasks_per_mission=options['tasks'],
+            prefix='bench_api',
+        )
+        seed_seconds = time.perf_counter() - seed_start
+
+        profiles = UserProfile.objects.select_related('user').in_bulk(
+            [ids['admin'], ids['organizer'], ids['manager'], ids['staff']])
+        clients = {}
+        for role in ('admin', 'organizer', 'manager', 'staff'):
+            client = APIClient()
+            token = RefreshToken.for_user(profiles[ids[role]].user).access_token
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            clients[role] = client
+        clients[None] = APIClient()
+
+        staff_user = profiles[ids['staff']].user
+        ctx = {
+            **ids,
+            'company': Company.objects.filter(created_by_id=ids['admin']).values_list('id', flat=True).first(),
+            'staff_username': staff_user.username,
+            'staff_refresh': str(RefreshToken.for_user(staff_user)),
+            'job': AIJob.objects.create(kind='suggest_mission', payload={'event': ids['event']},
+                                        created_by_id=ids['organizer']).id,
+        }
+
+        wanted = set(options['routes'].split(',')) if options['routes'] else None
+        counter = itertools.count()
+        results = {}
+        for name, role, method, path, data, setup in build_routes(ids):
+            if wanted and name not in wanted:
+                continue
+            timings, queries, sizes, statuses = [], [], [], set()
+            for _ in range(options['iterations']):
+                n = next(counter)
+                route_ctx = {**ctx, 'n': n, **(setup(ids, n) if setup else {})}
+                request_path = _format(path, route_ctx)
+                body = _format(data, route_ctx) if data is not None else None
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = getattr(clients[role], method)(request_path, body, format='json')
+                    size = _body_size(response)
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries.append(len(captured.captured_queries))
+                sizes.append(size)
+                statuses.add(response.status_code)
+            results[name] = {
+                'role': role,
+                'method': method.upper(),
+                'path': path,
+                'status': sorted(statuses),
+                'expected_status': EXPECTED_STATUS.get(name),
+                **summarize_ms(timings),
+                'queries': max(queries),
+                'bytes': max(sizes),
+            }
+
+        return {
+            'vendor': connection.vendor,
+            'seed_seconds': round(seed_seconds, 3),
+            'volumes': {
+                'companies': options['companies'], 'events_per_company': options['events'],
+                'teams_per_event': options['teams'], 'members_per_team': options['members'],
+                'missions_per_team': options['missions'], 'tasks_per_mission': options['tasks'],
+                'tasks': Task.objects.count(),
+            },
+            'iterations': options['iterations'],
+            'routes': results,
+        }
@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.benchmarks.stats import summarize_ms
+
+
+def _connect(base):
+    connection_class = HTTPSConnection if base.scheme == 'https' else HTTPConnection
+    return connection_class(base.hostname, base.port, timeout=30)
+
+
+def login(base, username, password):
+    conn = _connect(base)
+    conn.request('POST', '/login/', json.dumps({'username': username, 'password': password}),
+                 {'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    body = json.loads(response.read())
+    if response.status != 200:
+        raise CommandError(f'Login failed: {body}')
+    return body['access']
+
+
+def worker(base, paths, headers, deadline, results, lock):
+    """Keep-alive client loop: cycle through `paths` until the deadline."""
+    conn = _connect(base)
+    timings, errors, i = [], 0, 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+        except OSError:
+            errors += 1
+            conn.close()
+            conn = _connect(base)
+            continue
+        timings.append((time.perf_counter() - start) * 1000)
+    conn.close()
+    with lock:
+        results['timings'].extend(timings)
+        results['errors'] += errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive a running server over HTTP (GET, keep-alive, N concurrent clients) '
+        'and report throughput and latency as JSON. Use it to compare serving '
+        'modes, e.g. runserver vs gunicorn WSGI vs gunicorn ASGI.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Path to GET; repeat for a mix (default: /profiles/me/)')
+        parser.add_argument('--token', help='JWT access token')
+        parser.add_argument('--username', help='Log in via /login/ instead of --token')
+        parser.add_argument('--password')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds')
+
+    def handle(self, *args, **options):
+        base = urlsplit(options['base_url'])
+        token = options['token']
+        if not token and options['username']:
+            token = login(base, options['username'], options['password'])
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        paths = options['paths'] or ['/profiles/me/']
+
+        results, lock = {'timings': [], 'errors': 0}, threading.Lock()
+        start = time.perf_counter()
+        deadline = start + options['duration']
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for _ in range(options['concurrency']):
+                pool.submit(worker, base, paths, headers, deadline, results, lock)
+        elapsed = time.perf_counter() - start
+
+        report = {
+            'base_url': options['base_url'],
+            'paths': paths,
+            'concurrency': options['concurrency'],
+            'seconds': round(elapsed, 3),
+            'requests': len(results['timings']),
+            'errors': results['errors'],
+            'requests_per_second': round(len(results['timings']) / elapsed, 1),
+            **summarize_ms(results['timings'] or [0.0]),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,149 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from main_app.benchmarks.seed import seed
+from main_app.benchmarks.stats import summarize_ms
+from main_app.models import UserProfile, Event, Team, Mission, Task
+
+
+def hot_queries(ids):
+    """The role-scoped filters the views run, keyed by a short name."""
+    staff, manager = ids['staff'], ids['manager']
+    return {
+        'staff_tasks': Task.objects.filter(assignee_id=staff),
+        'staff_tasks_by_status': Task.objects.filter(assignee_id=staff, status='pending'),
+        'staff_open_tasks': Task.objects.filter(assignee_id=staff).exclude(status='done'),
+        'manager_tasks': Task.objects.filter(Q(assignee_id=manager) | Q(team__manager_id=manager)),
+        'team_tasks_by_status': Task.objects.filter(team_id=ids['team'], status='in_progress'),
+        'mission_ai_tasks': Task.objects.filter(mission_id=ids['mission'], ai_generated=True),
+        'event_recent_tasks': Task.objects.filter(event_id=ids['event']).order_by('-created_at')[:50],
+        'manager_missions': Mission.objects.filter(team__manager_id=manager),
+        'assigned_unapproved_missions': Mission.objects.filter(assigned_manager_id=manager, is_approved=False),
+        'staff_missions': Mission.objects.filter(team__members__id=staff),
+        'event_recent_missions': Mission.objects.filter(event_id=ids['event']).order_by('-created_at')[:50],
+    }
+
+
+def measure(queries, repeat):
+    results = {}
+    for name, queryset in queries.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {**summarize_ms(timings), 'plan': queryset.explain()}
+    return results
+
+
+def existing_ids():
+    def first(queryset):
+        return queryset.order_by('id').values_list('id', flat=True).first()
+    return {
+        'staff': first(UserProfile.objects.filter(role='staff', tasks__isnull=False)),
+        'manager': first(UserProfile.objects.filter(role='manager', managed_teams__isnull=False)),
+        'event': first(Event.objects.filter(tasks__isnull=False)),
+        'team': first(Team.objects.filter(tasks__isnull=False)),
+        'mission': first(Mission.objects.filter(subtasks__isnull=False)),
+    }
+
+
+def is_test_database():
+    """True for Django's test databases (test_<name>, in-memory SQLite)."""
+    name = str(connection.settings_dict['NAME'])
+    test_name = connection.settings_dict.get('TEST', {}).get('NAME')
+    in_memory = getattr(connection, 'is_in_memory_db', lambda: False)()
+    return in_memory or name.startswith('test_') or (test_name is not None and name == test_name)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the role-scoped task/mission queries and record their plans. '
+        'With --compare, runs once without the Meta.indexes of Task and Mission '
+        'and once with them. Everything runs in one transaction that is rolled '
+        'back; --seed and --compare also need a test database or --force, since '
+        'dropping indexes locks the tables until the end.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='Insert a synthetic dataset first')
+        parser.add_argument('--prefix', default='bench', help='Name prefix for seeded rows')
+        parser.add_argument('--companies', type=int, default=2)
+        parser.add_argument('--events', type=int, default=5, help='Events per company')
+        parser.add_argument('--teams', type=int, default=4, help='Teams per event')
+        parser.add_argument('--members', type=int, default=25, help='Members per team')
+        parser.add_argument('--missions', type=int, default=5, help='Missions per team')
+        parser.add_argument('--tasks', type=int, default=10, help='Tasks per mission')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--compare', action='store_true')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+        parser.add_argument('--force', action='store_true',
+                            help='Allow --seed/--compare on a database that is not a test database')
+
+    def handle(self, *args, **options):
+        if (options['seed'] or options['compare']) and not (options['force'] or is_test_database()):
+            raise CommandError(
+                f"{connection.settings_dict['NAME']} is not a test database; "
+                '--seed/--compare lock its tables while running, pass --force to go ahead')
+        if options['compare'] and not connection.features.can_rollback_ddl:
+            self.stderr.write('This backend commits DDL; the dropped indexes are recreated afterwards instead')
+
+        with transaction.atomic():
+            report = self.run(options)
+            transaction.set_rollback(True)
+        if report is None:
+            self.stderr.write('No data to benchmark; run with --seed')
+            return
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def run(self, options):
+        if options['seed']:
+            ids = seed(
+                companies=options['companies'], events_per_company=options['events'],
+                teams_per_event=options['teams'], members_per_team=options['members'],
+                missions_per_team=options['missions'], tasks_per_mission=options['tasks'],
+                prefix=options['prefix'],
+            )
+        else:
+            ids = existing_ids()
+        if None in ids.values():
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        queries = hot_queries(ids)
+        report = {'vendor': connection.vendor, 'tasks': Task.objects.count(), 'ids': ids}
+
+        if options['compare']:
+            indexes = [(model, index) for model in (Task, Mission) for index in model._meta.indexes]
+            # the editor only builds the SQL: entering it is refused inside a
+            # transaction on SQLite, and the DDL has to stay in this one
+            editor = connection.schema_editor()
+            with connection.cursor() as cursor:
+                for model, index in indexes:
+                    cursor.execute(editor.sql_delete_index % {
+                        'name': editor.quote_name(index.name),
+                        'table': editor.quote_name(model._meta.db_table),
+                    })
+            try:
+                report['before'] = measure(queries, options['repeat'])
+            finally:
+                with connection.cursor() as cursor:
+                    for model, index in indexes:
+                        cursor.execute(str(index.create_sql(model, editor)))
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        report['after'] = measure(queries, options['repeat'])
+        return report
@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main_app.benchmarks.stats import summarize_ms
+
+# Runs in a fresh interpreter: boot Django, load the URLconf (which imports
+# every view) and report timings plus whether the Gemini SDK got imported.
+STARTUP_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+setup_ms = (time.perf_counter() - start) * 1000
+from django.conf import settings
+from importlib import import_module
+import_module(settings.ROOT_URLCONF)
+ready_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({'setup_ms': setup_ms, 'ready_ms': ready_ms,
+                  'sdk_imported': 'google.genai' in sys.modules}))
+"""
+
+# What module-level `from google import genai` used to add to every boot.
+SDK_SNIPPET = """
+import json, time
+start = time.perf_counter()
+try:
+    from google import genai
+except ImportError:
+    print(json.dumps({'sdk_import_ms': None}))
+else:
+    print(json.dumps({'sdk_import_ms': (time.perf_counter() - start) * 1000}))
+"""
+
+
+def run_snippet(snippet):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+    output = subprocess.run(
+        [sys.executable, '-c', snippet], env=env, cwd=settings.BASE_DIR,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure cold start (django.setup + URLconf import) in fresh interpreters, '
+        'and the cost of importing the Gemini SDK on its own, as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        runs = [run_snippet(STARTUP_SNIPPET) for _ in range(options['runs'])]
+        sdk_runs = [run_snippet(SDK_SNIPPET)['sdk_import_ms'] for _ in range(options['runs'])]
+        report = {
+            'runs': options['runs'],
+            'setup': summarize_ms([r['setup_ms'] for r in runs]),
+            'ready': summarize_ms([r['ready_ms'] for r in runs]),
+            'sdk_imported_at_startup': any(r['sdk_imported'] for r in runs),
+            'sdk_import': summarize_ms(sdk_runs) if None not in sdk_runs else None,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream events, teams, missions and tasks to NDJSON or CSV (same rows as '
+        'GET /bulk/export/), reading the database a chunk at a time. The output '
+        'can be fed back to bulk_import.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='Output file (default: stdout)')
+        parser.add_argument('--type', help='Comma-separated types (default: all)')
+        parser.add_argument('--event', type=int, help='Only this event and what belongs to it')
+        parser.add_argument('--format', choices=bulk.FORMATS, default='ndjson')
+
+    def handle(self, *args, **options):
+        try:
+            types = bulk.parse_types(options['type'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        rows = bulk.export_rows(types, options['event'])
+        if options['format'] == 'csv':
+            if len(types) != 1:
+                raise CommandError('CSV export takes exactly one --type')
+            chunks = bulk.write_csv(rows, types[0])
+        else:
+            chunks = bulk.write_ndjson(rows)
+
+        if options['path'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['path'], 'w', encoding='utf-8', newline='') as out:
+            for chunk in chunks:
+                out.write(chunk)
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app import bulk
+from main_app.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Import events, teams, missions and tasks from an NDJSON or CSV file '
+        '(same rows as POST /bulk/import/). The file is streamed and inserted '
+        'in BULK_BATCH_SIZE chunks; prints the created counts and row errors as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument('--format', choices=bulk.FORMATS,
+                            help='Default: csv for *.csv files, ndjson otherwise')
+        parser.add_argument('--type', choices=list(bulk.SERIALIZERS), help='Type of rows without a type column')
+        parser.add_argument('--user', help='Username recorded as created_by')
+        parser.add_argument('--batch-size', type=int, help='Rows per chunk (default: BULK_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        profile = None
+        if options['user']:
+            try:
+                profile = UserProfile.objects.get(user__username=options['user'])
+            except UserProfile.DoesNotExist:
+                raise CommandError(f'No profile for user {options["user"]!r}')
+        file_format = options['format'] or ('csv' if options['path'].endswith('.csv') else 'ndjson')
+
+        try:
+            with open(options['path'], 'rb') as lines:
+                report = bulk.import_rows(lines, file_format, profile=profile, default_type=options['type'],
+                                          batch_size=options['batch_size'])
+        except OSError as exc:
+            raise CommandError(exc)
+        self.stdout.write(json.dumps(report, indent=2))
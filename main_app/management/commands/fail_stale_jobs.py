@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from main_app.jobs import fail_stale_jobs, stale_after
+
+
+class Command(BaseCommand):
+    help = (
+        'Fail AI jobs left queued or running by a worker that exited (restart, '
+        'max_requests recycling). Only jobs idle for longer than every attempt '
+        'could take are touched, so it is safe while workers run. The image '
+        'runs it on start; GET /ai/jobs/<id>/ also checks the polled job.'
+    )
+
+    def handle(self, *args, **options):
+        failed = fail_stale_jobs()
+        self.stdout.write(f'Failed {failed} AI jobs idle for more than {stale_after():.0f}s')
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main_app.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete tombstones older than DELTA_SYNC_RETENTION_DAYS. Clients with an '
+        'older ?since= cursor get 410 and refetch, so nothing is lost. Run daily.'
+    )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=settings.DELTA_SYNC_RETENTION_DAYS)
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(f'Deleted {deleted} tombstones older than {cutoff.isoformat()}')
@@ -0,0 +1,39 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+# ===============================
+# Static files (WhiteNoise) for both WSGI and ASGI
+# ===============================
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware is sync-only, so under ASGI Django would run every
+    request below it in a thread. This adds the async path: the file lookup
+    is an in-memory dict (or a stat in DEBUG), so it runs on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _static_file(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        static_file = self._static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        static_file = self._static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0016_aijob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['team', 'status'], name='mission_team_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['assigned_manager', 'is_approved'], name='mission_manager_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['event', 'created_at'], name='mission_event_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee', 'status'], name='task_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['team', 'status'], name='task_team_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['mission', 'ai_generated'], name='task_mission_ai_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['event', 'created_at'], name='task_event_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'done'), _negated=True), fields=['assignee'], name='task_open_assignee_idx'),
+        ),
+    ]
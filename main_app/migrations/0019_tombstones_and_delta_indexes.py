@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0018_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('task', 'Task'), ('mission', 'Mission')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('team_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('assignee_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('mission_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['updated_at'], name='mission_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['updated_at'], name='task_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ),
+    ]
@@ -73,6 +73,8 @@ class Event(models.Model):
         blank=True
     )
 
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return self.title
 
@@ -105,6 +107,7 @@ class Team(models.Model):
         related_name="created_teams"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # also bumped on membership changes
 
     def __str__(self):
         event_title = self.event.title if self.event else "No Event"
@@ -145,6 +148,7 @@ class Mission(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
    
     ai_split = models.BooleanField(default=False)
@@ -152,6 +156,14 @@ class Mission(models.Model):
 
     status = models.CharField(max_length=20, choices=TASK_STATUS_CHOICES, default='pending')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['team', 'status'], name='mission_team_status_idx'),
+            models.Index(fields=['assigned_manager', 'is_approved'], name='mission_manager_approved_idx'),
+            models.Index(fields=['event', 'created_at'], name='mission_event_created_idx'),
+            models.Index(fields=['updated_at'], name='mission_updated_idx'),  # ?since= delta sync
+        ]
+
     def __str__(self):
         return f"Mission: {self.title} ({self.team.name} - {self.event.title})"
 
@@ -202,11 +214,90 @@ class Task(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=TASK_STATUS_CHOICES, default='pending')
     ai_generated = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['assignee', 'status'], name='task_assignee_status_idx'),
+            models.Index(fields=['team', 'status'], name='task_team_status_idx'),
+            models.Index(fields=['mission', 'ai_generated'], name='task_mission_ai_idx'),
+            models.Index(fields=['event', 'created_at'], name='task_event_created_idx'),
+            models.Index(fields=['updated_at'], name='task_updated_idx'),  # ?since= delta sync
+            # open work per assignee (everything not done); keeps the index small
+            models.Index(fields=['assignee'], condition=~models.Q(status='done'), name='task_open_assignee_idx'),
+        ]
+
+    def delete(self, *args, **kwargs):
+        # Cascades remove tasks with one DELETE and no per-row signals; a
+        # task deleted on its own gets its tombstone here (signals.py).
+        from .signals import record_task_delete
+        record_task_delete(self)
+        return super().delete(*args, **kwargs)
+
     def __str__(self):
         base = f"{self.title}"
         if self.mission:
             base += f" (sub of {self.mission.title})"
-        return base
\ No newline at end of file
+        return base
+
+# ===============================
+# 🔹 Tombstone (deleted task/mission, for ?since= delta sync)
+# ===============================
+TOMBSTONE_MODEL_CHOICES = [
+    ('task', 'Task'),
+    ('mission', 'Mission'),
+]
+
+
+class Tombstone(models.Model):
+    # Plain ids, not FKs: the rows they point to are usually gone too.
+    # team/assignee/mission let the delta endpoint scope deletes by role.
+    model = models.CharField(max_length=20, choices=TOMBSTONE_MODEL_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    team_id = models.PositiveBigIntegerField(null=True, blank=True)
+    assignee_id = models.PositiveBigIntegerField(null=True, blank=True)
+    mission_id = models.PositiveBigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted {self.deleted_at}"
+
+
+# ===============================
+# 🔹 AI Job (background Gemini call)
+# ===============================
+AI_JOB_STATUS_CHOICES = [
+    ('queued', 'Queued'),
+    ('running', 'Running'),
+    ('succeeded', 'Succeeded'),
+    ('failed', 'Failed'),
+]
+
+
+class AIJob(models.Model):
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=AI_JOB_STATUS_CHOICES, default='queued')
+    payload = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    attempts = models.PositiveIntegerField(default=0)
+
+    created_by = models.ForeignKey(
+        UserProfile,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name="ai_jobs"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"AIJob {self.id}: {self.kind} ({self.status})"
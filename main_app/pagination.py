@@ -0,0 +1,72 @@
+from django.http import StreamingHttpResponse
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+
+STREAM_CHUNK_SIZE = 500
+TRUE_VALUES = ('1', 'true', 'yes')
+
+
+# ===============================
+# Keyset (cursor) pagination
+# ===============================
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination ordered on a unique, indexed column so each page is a
+    `WHERE id > <last id> LIMIT n` instead of an OFFSET scan.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'id'
+
+
+def wants_pagination(request):
+    params = request.query_params
+    return 'cursor' in params or 'page_size' in params
+
+
+def wants_stream(request):
+    return request.query_params.get('stream', '').lower() in TRUE_VALUES
+
+
+# ===============================
+# Streaming JSON array
+# ===============================
+def stream_json_array(queryset, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield a JSON array one serialized row at a time. `iterator()` uses a
+    server-side cursor on Postgres, so memory stays flat with table size.
+    """
+    encoder = JSONEncoder()
+    yield '['
+    first = True
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        if not first:
+            yield ','
+        first = False
+        yield encoder.encode(serializer_class(obj).data)
+    yield ']'
+
+
+def list_response(request, queryset, serializer_class, ordering='id'):
+    """
+    Shared GET handler for list endpoints:
+      - `?stream=1`             -> streamed JSON array of every row
+      - `?cursor=` / `?page_size=` -> keyset-paginated page with next/previous links
+      - otherwise               -> the plain array clients already expect
+    """
+    if wants_stream(request):
+        return StreamingHttpResponse(
+            stream_json_array(queryset.order_by(ordering), serializer_class),
+            content_type='application/json'
+        )
+
+    if wants_pagination(request):
+        paginator = KeysetCursorPagination()
+        paginator.ordering = ordering
+        page = paginator.paginate_queryset(queryset, request)
+        return paginator.get_paginated_response(serializer_class(page, many=True).data)
+
+    return Response(serializer_class(queryset, many=True).data)
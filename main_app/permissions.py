@@ -0,0 +1,123 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import BasePermission
+from rest_framework.views import exception_handler as drf_exception_handler
+
+from .models import Team
+
+
+# ===============================
+# Access index (team ids per profile)
+# ===============================
+# Built once per profile and cached, so object-level checks are set lookups
+# instead of FK loads like task.team.manager. Signals in signals.py drop the
+# entry when Team.members, Team.manager or a UserProfile change. The role
+# itself is read from request.profile, which is loaded with the user on every
+# request, so a demotion never waits on cache invalidation.
+
+AccessIndex = namedtuple('AccessIndex', ['managed_team_ids', 'member_team_ids'])
+
+
+def _index_key(profile_id):
+    return f'access-index:{profile_id}'
+
+
+def build_access_index(profile):
+    return AccessIndex(
+        managed_team_ids=frozenset(Team.objects.filter(manager=profile).values_list('id', flat=True)),
+        member_team_ids=frozenset(profile.teams.values_list('id', flat=True)),
+    )
+
+
+def get_access_index(profile):
+    key = _index_key(profile.id)
+    index = cache.get(key)
+    if index is None:
+        index = build_access_index(profile)
+        cache.set(key, index, settings.ACCESS_INDEX_TTL)
+    return index
+
+
+def invalidate_access_index(*profile_ids):
+    cache.delete_many([_index_key(profile_id) for profile_id in profile_ids if profile_id])
+
+
+# ===============================
+# Permission classes
+# ===============================
+# Denials keep the API's {"error": ...} 403 body. A view can word them per
+# method with `denied_messages`; otherwise the class `message` is used.
+def exception_handler(exc, context):
+    response = drf_exception_handler(exc, context)
+    if isinstance(exc, PermissionDenied) and response is not None:
+        messages = getattr(context.get('view'), 'denied_messages', {})
+        response.data = {'error': messages.get(context['request'].method, str(exc.detail))}
+    return response
+
+
+class HasRole(BasePermission):
+    """
+    Allow only the roles in `roles`. If `methods` is set, other HTTP methods
+    are let through (e.g. anyone may list, only organizers may POST).
+    """
+    roles = ()
+    methods = None
+
+    def has_permission(self, request, view):
+        if self.methods is not None and request.method not in self.methods:
+            return True
+        return request.profile.role in self.roles
+
+
+class IsAdmin(HasRole):
+    roles = ('admin',)
+    message = 'Admin only'
+
+
+class IsManager(HasRole):
+    roles = ('manager',)
+    message = 'Only managers can do this'
+
+
+class IsOrganizerOrAdmin(HasRole):
+    roles = ('organizer', 'admin')
+    message = 'Only organizers or admins can do this'
+
+
+class IsOrganizerToCreate(HasRole):
+    roles = ('organizer',)
+    methods = ('POST',)
+    message = 'Only organizers can create this'
+
+
+class IsOrganizerOrAdminToDelete(HasRole):
+    roles = ('organizer', 'admin')
+    methods = ('DELETE',)
+    message = 'Only organizers or admins can delete this'
+
+
+class IsTeamCreatorOrAdmin(BasePermission):
+    message = 'Only organizer or admin can change this team'
+
+    def has_object_permission(self, request, view, obj):
+        profile = request.profile
+        return obj.created_by_id == profile.id or profile.role == 'admin'
+
+
+class CanChangeTask(BasePermission):
+    """
+    PATCH: managers only on tasks assigned to them or in a team they manage.
+    DELETE: organizers/admins, or the assignee, or the team's manager.
+    """
+    message = 'You cannot change this task'
+
+    def has_object_permission(self, request, view, obj):
+        profile = request.profile
+        owns_task = (obj.assignee_id == profile.id or
+                     obj.team_id in get_access_index(profile).managed_team_ids)
+        if request.method == 'DELETE':
+            return profile.role in ('organizer', 'admin') or owns_task
+        return profile.role != 'manager' or owns_task
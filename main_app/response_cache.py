@@ -0,0 +1,79 @@
+import hashlib
+
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from .pagination import wants_stream
+
+
+# ===============================
+# Cached GET responses for read-heavy endpoints
+# ===============================
+# Rendered JSON lives in the 'responses' cache alias (see CACHES in settings).
+# Keys are per namespace ('events', 'companies'), prefixed with a generation
+# number that signals bump on any write, so one incr drops every page, filter
+# and detail of that namespace at once. The body hash doubles as the ETag.
+
+NAMESPACES = ('events', 'companies')
+
+
+def get_cache():
+    return caches['responses']
+
+
+def _generation_key(namespace):
+    return f'responses:gen:{namespace}'
+
+
+def get_generation(namespace):
+    return get_cache().get_or_set(_generation_key(namespace), 0, timeout=None)
+
+
+def invalidate(*namespaces):
+    cache = get_cache()
+    for namespace in namespaces:
+        try:
+            cache.incr(_generation_key(namespace))
+        except ValueError:
+            cache.set(_generation_key(namespace), 1, timeout=None)
+
+
+def make_key(namespace, request):
+    # host is part of the key because pagination links are absolute URLs
+    digest = hashlib.sha256(f'{request.get_host()}{request.get_full_path()}'.encode('utf-8')).hexdigest()
+    return f'responses:{namespace}:{get_generation(namespace)}:{digest}'
+
+
+def _not_modified(request, etag):
+    return etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+
+def cached_response(request, namespace, build):
+    """
+    GET handler wrapper: serve `build()`'s JSON from the cache while the
+    namespace is unchanged, and answer If-None-Match with a bodiless 304.
+    Only successful, non-streamed responses are cached.
+    """
+    if wants_stream(request):
+        return build()
+
+    cache = get_cache()
+    key = make_key(namespace, request)
+    cached = cache.get(key)
+    if cached is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+        body = JSONRenderer().render(response.data)
+        cached = (quote_etag(hashlib.md5(body).hexdigest()), body)
+        cache.set(key, cached)
+
+    etag, body = cached
+    if _not_modified(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
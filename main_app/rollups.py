@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Event, Mission, Task, TASK_STATUS_CHOICES
+
+
+# ===============================
+# Per-event progress rollups
+# ===============================
+# Task and mission counts by status for an event, per team and per mission.
+# They are computed from one grouped aggregate over the event's tasks and
+# one read of its missions, then cached. Signals in signals.py drop the
+# entry when a task or mission of the event is saved or deleted. Bulk writes
+# (bulk.py) drop it themselves.
+
+def _key(event_id):
+    return f'rollup:{event_id}'
+
+
+def _counts():
+    return {'total': 0, **{value: 0 for value, _ in TASK_STATUS_CHOICES}}
+
+
+def _add(counts, status, n=1):
+    counts['total'] += n
+    counts[status] = counts.get(status, 0) + n
+
+
+def _progress(counts):
+    return round(counts['done'] / counts['total'], 4) if counts['total'] else 0.0
+
+
+def build_rollup(event_id):
+    tasks = _counts()
+    missions = {**_counts(), 'approved': 0}
+    teams = {}
+    by_mission = {}
+
+    def team_entry(team_id):
+        if team_id not in teams:
+            teams[team_id] = {'team': team_id, 'tasks': _counts(), 'missions': {**_counts(), 'approved': 0}}
+        return teams[team_id]
+
+    for mission_id, team_id, status, is_approved in Mission.objects.filter(
+            event_id=event_id).values_list('id', 'team_id', 'status', 'is_approved'):
+        by_mission[mission_id] = {'mission': mission_id, 'team': team_id, 'tasks': _counts()}
+        for counts in (missions, team_entry(team_id)['missions']):
+            _add(counts, status)
+            counts['approved'] += is_approved
+
+    task_groups = (
+        Task.objects.filter(event_id=event_id)
+        .values_list('team_id', 'mission_id', 'status')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for team_id, mission_id, status, n in task_groups:
+        _add(tasks, status, n)
+        _add(team_entry(team_id)['tasks'], status, n)
+        if mission_id in by_mission:
+            _add(by_mission[mission_id]['tasks'], status, n)
+
+    for entry in [*teams.values(), *by_mission.values()]:
+        entry['progress'] = _progress(entry['tasks'])
+    return {
+        'event': event_id,
+        'tasks': tasks,
+        'missions': missions,
+        'progress': _progress(tasks),
+        # None (tasks without a team) sorts first
+        'by_team': sorted(teams.values(), key=lambda entry: (entry['team'] is not None, entry['team'] or 0)),
+        'by_mission': sorted(by_mission.values(), key=lambda entry: entry['mission']),
+        'computed_at': timezone.now(),
+    }
+
+
+def get_rollup(event_id):
+    """The event's rollup, from the cache when possible; None if there is no such event."""
+    key = _key(event_id)
+    rollup = cache.get(key)
+    if rollup is None:
+        if not Event.objects.filter(pk=event_id).exists():
+            return None
+        rollup = build_rollup(event_id)
+        cache.set(key, rollup, settings.ROLLUP_CACHE_TTL)
+    return rollup
+
+
+def invalidate(*event_ids):
+    cache.delete_many([_key(event_id) for event_id in event_ids if event_id])
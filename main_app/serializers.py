@@ -1,12 +1,22 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile, Company, Event, Team, Task, Mission 
+from django.db.models import Count, Prefetch, Q
+from .models import UserProfile, Company, Event, Team, Task, Mission, AIJob, TASK_STATUS_CHOICES
+from .instrumentation import span
+
+
+class InstrumentedModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer whose rendering time is reported as the 'serializer' span."""
+
+    def to_representation(self, instance):
+        with span('serializer'):
+            return super().to_representation(instance)
 
 
 # ===============================
 # 🔹 User & Profile
 # ===============================
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(InstrumentedModelSerializer):
     password = serializers.CharField(write_only=True)
 
     class Meta:
@@ -22,7 +32,7 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(InstrumentedModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.EmailField(source='user.email', read_only=True)
 
@@ -34,7 +44,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
 # ===============================
 # 🔹 Company
 # ===============================
-class CompanySerializer(serializers.ModelSerializer):
+class CompanySerializer(InstrumentedModelSerializer):
     created_by = UserProfileSerializer(read_only=True)
 
     class Meta:
@@ -45,7 +55,7 @@ class CompanySerializer(serializers.ModelSerializer):
 # ===============================
 # 🔹 Event
 # ===============================
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(InstrumentedModelSerializer):
     created_by_name = serializers.CharField(source='created_by.user.username', read_only=True)
     company_name = serializers.CharField(source='company.name', read_only=True)
 
@@ -67,7 +77,7 @@ class EventSerializer(serializers.ModelSerializer):
 
 
 
-class TeamSerializer(serializers.ModelSerializer):
+class TeamSerializer(InstrumentedModelSerializer):
     manager_name = serializers.CharField(source='manager.user.username', read_only=True)
     member_names = serializers.SerializerMethodField()  # NEW
     created_by_name = serializers.CharField(source='created_by.user.username', read_only=True)
@@ -92,10 +102,39 @@ class TeamSerializer(serializers.ModelSerializer):
             team.members.set(members_data)
         return team
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # members (ids + usernames) come from one prefetch that JOINs the users
+        members = UserProfile.objects.select_related('user').order_by('id')
+        return queryset.select_related('manager__user', 'created_by__user').prefetch_related(
+            Prefetch('members', queryset=members))
+
+
+class TeamSummarySerializer(InstrumentedModelSerializer):
+    """
+    Team without member lists, for large teams. Expects the queryset from
+    setup_eager_loading (member_count is an SQL annotation).
+    """
+    manager_name = serializers.CharField(source='manager.user.username', read_only=True)
+    created_by_name = serializers.CharField(source='created_by.user.username', read_only=True)
+    member_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Team
+        fields = [
+            'id', 'name', 'manager', 'manager_name', 'member_count', 'event',
+            'created_by', 'created_by_name', 'created_at'
+        ]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('manager__user', 'created_by__user').annotate(
+            member_count=Count('members', distinct=True))
+
 # ===============================
 # 🔹 Task
 # ===============================
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(InstrumentedModelSerializer):
     assignee_name = serializers.CharField(source='assignee.user.username', read_only=True)
     team_name = serializers.CharField(source='team.name', read_only=True)
     event_title = serializers.CharField(source='event.title', read_only=True)
@@ -115,11 +154,16 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_by', 'created_at']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # Every *_name / *_title field above follows a FK; load them in one JOIN
+        return queryset.select_related('assignee__user', 'team', 'event', 'mission')
+
 
 # ===============================
 # 🔹 Mission
 # ===============================
-class MissionSerializer(serializers.ModelSerializer):
+class MissionSerializer(InstrumentedModelSerializer):
     event_title = serializers.CharField(source='event.title', read_only=True)
     team_name = serializers.CharField(source='team.name', read_only=True)
     created_by_name = serializers.CharField(source='created_by.user.username', read_only=True)
@@ -134,3 +178,115 @@ class MissionSerializer(serializers.ModelSerializer):
             'ai_split', 'is_approved', 'event_title', 'team_name', 
             'created_by_name', 'subtasks'
         ]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # Nested subtasks come from one prefetch query that already JOINs their FKs
+        subtasks = TaskSerializer.setup_eager_loading(Task.objects.all())
+        return queryset.select_related(
+            'event', 'team', 'created_by__user', 'assigned_manager__user'
+        ).prefetch_related(Prefetch('subtasks', queryset=subtasks))
+
+
+class MissionSummarySerializer(InstrumentedModelSerializer):
+    """
+    Compact mission for dashboards: subtask totals instead of nested tasks.
+    Expects the queryset from setup_eager_loading (counts are SQL annotations).
+    """
+    event_title = serializers.CharField(source='event.title', read_only=True)
+    team_name = serializers.CharField(source='team.name', read_only=True)
+    assigned_manager_name = serializers.CharField(source='assigned_manager.user.username', read_only=True)
+    subtask_count = serializers.IntegerField(read_only=True)
+    subtask_status_counts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Mission
+        fields = [
+            'id', 'title', 'event', 'team', 'assigned_manager', 'assigned_manager_name',
+            'ai_split', 'is_approved', 'status', 'event_title', 'team_name',
+            'subtask_count', 'subtask_status_counts'
+        ]
+
+    def get_subtask_status_counts(self, obj):
+        return {value: getattr(obj, f'subtasks_{value}') for value, _ in TASK_STATUS_CHOICES}
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        status_counts = {
+            f'subtasks_{value}': Count('subtasks', filter=Q(subtasks__status=value), distinct=True)
+            for value, _ in TASK_STATUS_CHOICES
+        }
+        return queryset.select_related(
+            'event', 'team', 'assigned_manager__user'
+        ).annotate(subtask_count=Count('subtasks', distinct=True), **status_counts)
+
+
+# ===============================
+# 🔹 Bulk import / export (bulk.py)
+# ===============================
+class MappedPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """
+    FK field for bulk import: looks ids up in the chunk's prefetched objects
+    (context['objects']) and refs in rows imported earlier (context['refs'])
+    instead of running one query per value.
+    """
+    default_error_messages = {
+        'unknown_ref': 'Unknown ref "{ref}"; a ref must name an earlier row of the import.',
+    }
+
+    def to_internal_value(self, data):
+        model = self.queryset.model
+        if isinstance(data, str) and not data.isdigit():
+            obj = self.context['refs'].get((model, data))
+            if obj is None:
+                self.fail('unknown_ref', ref=data)
+            return obj
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            obj = self.context['objects'].get(model, {}).get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+class BulkEventSerializer(EventSerializer):
+    serializer_related_field = MappedPrimaryKeyField
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('created_by__user', 'company')
+
+
+class BulkTeamSerializer(TeamSerializer):
+    serializer_related_field = MappedPrimaryKeyField
+
+
+class BulkMissionSerializer(MissionSerializer):
+    """Flat mission: status instead of nested subtasks (tasks are rows of their own)."""
+    serializer_related_field = MappedPrimaryKeyField
+    subtasks = None
+
+    class Meta(MissionSerializer.Meta):
+        fields = [name for name in MissionSerializer.Meta.fields if name != 'subtasks'] + ['status']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('event', 'team', 'created_by__user', 'assigned_manager__user')
+
+
+class BulkTaskSerializer(TaskSerializer):
+    serializer_related_field = MappedPrimaryKeyField
+
+
+# ===============================
+# 🔹 AI Job
+# ===============================
+class AIJobSerializer(InstrumentedModelSerializer):
+    job_id = serializers.IntegerField(source='id', read_only=True)
+
+    class Meta:
+        model = AIJob
+        fields = ['job_id', 'kind', 'status', 'result', 'error', 'attempts', 'created_at', 'updated_at']
@@ -0,0 +1,280 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import ai_cache, broker, delta, response_cache, rollups, workload
+from .models import Company, Event, Mission, Task, Team, Tombstone, UserProfile
+from .permissions import invalidate_access_index
+
+
+# ===============================
+# AI suggestion cache invalidation
+# ===============================
+@receiver(post_save, sender=Event)
+def invalidate_ai_cache_on_event_change(sender, instance, **kwargs):
+    ai_cache.invalidate_event(instance.id)
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def invalidate_ai_cache_on_team_change(sender, instance, **kwargs):
+    ai_cache.invalidate_event(instance.event_id)
+
+
+@receiver(m2m_changed, sender=Team.members.through)
+def invalidate_ai_cache_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        ai_cache.invalidate_event(instance.event_id)
+        return
+    # profile.teams.add(...): instance is the UserProfile, pk_set holds team ids
+    teams = Team.objects.filter(pk__in=pk_set) if pk_set else instance.teams.all()
+    for event_id in set(teams.values_list('event_id', flat=True)):
+        ai_cache.invalidate_event(event_id)
+
+
+# ===============================
+# Team.updated_at on membership changes (conditional GET)
+# ===============================
+@receiver(m2m_changed, sender=Team.members.through)
+def touch_team_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        team_ids = [instance.pk]
+    elif action == 'pre_clear':
+        team_ids = list(instance.teams.values_list('id', flat=True))
+    else:
+        team_ids = pk_set
+    Team.objects.filter(pk__in=team_ids).update(updated_at=timezone.now())
+
+
+def _saves(update_fields, field):
+    return update_fields is None or field in update_fields
+
+
+# ===============================
+# Tombstones for ?since= delta sync (delta.py)
+# ===============================
+# Written in bulk from the root of a delete (event, team, mission, profile).
+# Nothing listens to task deletes, so a cascade removes tasks with a single
+# DELETE (Django's fast delete) instead of loading them and signalling per
+# row. A task deleted on its own is recorded by Task.delete(). Rollups and
+# workloads of the deleted rows are dropped here too.
+DELETE_SCOPES = {
+    Event: lambda event: (Task.objects.filter(event=event), Mission.objects.filter(event=event)),
+    Team: lambda team: (Task.objects.filter(Q(team=team) | Q(mission__team=team)),
+                        Mission.objects.filter(team=team)),
+    Mission: lambda mission: (Task.objects.filter(mission=mission), Mission.objects.filter(pk=mission.pk)),
+    UserProfile: lambda profile: (Task.objects.filter(Q(assignee=profile) | Q(created_by=profile)), None),
+}
+
+
+def _inside(instance, origin):
+    """True when `origin`, the object being deleted, is the event or team `instance` belongs to."""
+    return (
+        isinstance(origin, Event) and getattr(instance, 'event_id', None) == origin.id
+        or isinstance(origin, Team) and getattr(instance, 'team_id', None) == origin.id
+    )
+
+
+@receiver(pre_delete, sender=Event)
+@receiver(pre_delete, sender=Team)
+@receiver(pre_delete, sender=Mission)
+@receiver(pre_delete, sender=UserProfile)
+def record_delete_tombstones(sender, instance, origin=None, **kwargs):
+    if _inside(instance, origin):
+        return  # the origin's own receiver covers this row's tasks and missions
+    # per delete() call, so rows reached from two roots get one tombstone
+    seen = origin.__dict__.setdefault('_tombstoned', set()) if origin is not None else None
+    tasks, missions = DELETE_SCOPES[sender](instance)
+    event_ids, assignee_ids = delta.record_deletes(tasks, missions, seen)
+    rollups.invalidate(*event_ids)
+    workload.invalidate(*assignee_ids)
+
+
+def record_task_delete(task):
+    """Called by Task.delete(), since no receiver listens to task deletes."""
+    delta.record_deletes(tasks=Task.objects.filter(pk=task.pk))
+    rollups.invalidate(task.event_id)
+    workload.invalidate(task.assignee_id)
+
+
+# A reassigned task (or a mission moved to another team) leaves the old
+# assignee's/team's scope: to them it reads as a delete. Readers that can
+# still see it get it under "changed", which wins over "deleted".
+@receiver(post_save, sender=Task)
+def record_task_scope_exit(sender, instance, created, **kwargs):
+    if not created and getattr(instance, '_left_scope', False):
+        Tombstone.objects.create(model='task', object_id=instance.id, team_id=instance._previous_team_id,
+                                 assignee_id=instance._previous_assignee_id, mission_id=instance.mission_id)
+
+
+@receiver(post_save, sender=Mission)
+def record_mission_scope_exit(sender, instance, created, **kwargs):
+    if not created and getattr(instance, '_left_scope', False):
+        Tombstone.objects.create(model='mission', object_id=instance.id, team_id=instance._previous_team_id)
+
+
+# ===============================
+# Push channel: task status and mission approval (broker.py)
+# ===============================
+@receiver(pre_save, sender=Task)
+def remember_previous_task_status(sender, instance, update_fields=None, **kwargs):
+    # the previous event, assignee and team are read here too, so rollups and
+    # workloads can drop the old owner's entry and delta sync can tell the
+    # old assignee/team the task left their scope
+    instance._previous_status = instance._previous_event_id = None
+    instance._previous_assignee_id = instance._previous_team_id = None
+    instance._left_scope = False
+    if instance.pk and (update_fields is None or {'status', 'event', 'assignee', 'team'} & set(update_fields)):
+        previous = (
+            Task.objects.filter(pk=instance.pk)
+            .values_list('status', 'event_id', 'assignee_id', 'team_id').first()
+        )
+        if previous:
+            if _saves(update_fields, 'status'):
+                instance._previous_status = previous[0]
+            (instance._previous_event_id, instance._previous_assignee_id,
+             instance._previous_team_id) = previous[1:]
+            instance._left_scope = (
+                _saves(update_fields, 'assignee') and previous[2] != instance.assignee_id
+                or _saves(update_fields, 'team') and previous[3] != instance.team_id
+            )
+
+
+@receiver(post_save, sender=Task)
+def publish_task_status(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_status', None)
+    if created or previous is None or previous == instance.status:
+        return
+    message = {
+        'type': 'task.status', 'task': instance.id, 'status': instance.status, 'previous': previous,
+        'mission': instance.mission_id, 'team': instance.team_id, 'event': instance.event_id,
+        'assignee': instance.assignee_id,
+    }
+    topics = broker.task_topics(instance)
+    transaction.on_commit(lambda: broker.get_broker().publish(topics, message))
+
+
+@receiver(pre_save, sender=Mission)
+def remember_previous_mission_approval(sender, instance, update_fields=None, **kwargs):
+    instance._was_approved = instance._previous_event_id = instance._previous_team_id = None
+    instance._left_scope = False
+    if instance.pk and (update_fields is None or {'is_approved', 'event', 'team'} & set(update_fields)):
+        previous = (
+            Mission.objects.filter(pk=instance.pk).values_list('is_approved', 'event_id', 'team_id').first()
+        )
+        if previous:
+            if _saves(update_fields, 'is_approved'):
+                instance._was_approved = previous[0]
+            instance._previous_event_id, instance._previous_team_id = previous[1:]
+            instance._left_scope = _saves(update_fields, 'team') and previous[2] != instance.team_id
+
+
+@receiver(post_save, sender=Mission)
+def publish_mission_approval(sender, instance, created, **kwargs):
+    if created or getattr(instance, '_was_approved', None) is not False or not instance.is_approved:
+        return
+    message = {
+        'type': 'mission.approved', 'mission': instance.id,
+        'team': instance.team_id, 'event': instance.event_id,
+    }
+    topics = broker.mission_topics(instance)
+    transaction.on_commit(lambda: broker.get_broker().publish(topics, message))
+
+
+# ===============================
+# Progress rollup invalidation (rollups.py)
+# ===============================
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Mission)
+def invalidate_event_rollup(sender, instance, **kwargs):
+    rollups.invalidate(instance.event_id, getattr(instance, '_previous_event_id', None))
+
+
+@receiver(post_delete, sender=Event)
+def drop_event_rollup(sender, instance, **kwargs):
+    rollups.invalidate(instance.id)
+
+
+# ===============================
+# Workload index invalidation (workload.py)
+# ===============================
+@receiver(post_save, sender=Task)
+def invalidate_assignee_workload(sender, instance, **kwargs):
+    workload.invalidate(instance.assignee_id, getattr(instance, '_previous_assignee_id', None))
+
+
+# ===============================
+# Response cache invalidation (response_cache.py)
+# ===============================
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_responses(sender, instance, **kwargs):
+    response_cache.invalidate('events')
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_company_responses(sender, instance, **kwargs):
+    # events embed company_name
+    response_cache.invalidate('companies', 'events')
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_responses_on_profile_change(sender, instance, **kwargs):
+    # companies embed their creator's profile, events the creator's username
+    response_cache.invalidate(*response_cache.NAMESPACES)
+
+
+@receiver(post_save, sender=User)
+def invalidate_responses_on_user_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {'username', 'email'} & set(update_fields):
+        return  # e.g. last_login or a rehashed password
+    response_cache.invalidate(*response_cache.NAMESPACES)
+
+
+# ===============================
+# Access index invalidation (permissions.py)
+# ===============================
+@receiver(post_save, sender=UserProfile)
+def invalidate_access_on_profile_change(sender, instance, **kwargs):
+    invalidate_access_index(instance.id)
+
+
+@receiver(pre_save, sender=Team)
+def remember_previous_team_manager(sender, instance, **kwargs):
+    instance._previous_manager_id = None
+    if instance.pk:
+        instance._previous_manager_id = (
+            Team.objects.filter(pk=instance.pk).values_list('manager_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Team)
+def invalidate_access_on_manager_change(sender, instance, **kwargs):
+    invalidate_access_index(instance.manager_id, getattr(instance, '_previous_manager_id', None))
+
+
+@receiver(pre_delete, sender=Team)
+def invalidate_access_on_team_delete(sender, instance, **kwargs):
+    # through rows are removed without m2m_changed, so collect members now
+    member_ids = list(instance.members.values_list('id', flat=True))
+    invalidate_access_index(instance.manager_id, *member_ids)
+
+
+@receiver(m2m_changed, sender=Team.members.through)
+def invalidate_access_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        invalidate_access_index(instance.id)
+    elif action == 'pre_clear':
+        invalidate_access_index(*instance.members.values_list('id', flat=True))
+    else:
+        invalidate_access_index(*pk_set)
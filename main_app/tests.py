@@ -1,9 +1,40 @@
-from django.test import TestCase
+from django.test import AsyncClient, TestCase, override_settings
+from asgiref.sync import sync_to_async
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+from django.utils.http import http_date
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.conf import settings
+from django.db.models.deletion import Collector
 from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 from .models import (
-    UserProfile, Company, Event, Team, Mission, Task
+    UserProfile, Company, Event, Team, Mission, Task, AIJob, Tombstone
 )
-from datetime import date
+from .ai_service import FakeLLMClient, set_llm_client, get_llm_client, agenerate
+from .jobs import aenqueue, run_job, stale_after, STALE_JOB_ERROR, _loop_tasks
+from .management.commands.bench_startup import STARTUP_SNIPPET, run_snippet
+from .urls import urlpatterns
+from .instrumentation import aggregator, fingerprint
+from .broker import InProcessBroker, OVERFLOW, get_broker, set_broker
+from .permissions import get_access_index
+from .workload import get_workloads
+from datetime import date, timedelta
+from io import StringIO
+import asyncio
+import contextvars
+import json
+import re
+import inspect
+import time
+import os
+import runpy
+import tempfile
+from unittest import mock
 
 
 class ModelsTest(TestCase):
@@ -148,3 +179,1408 @@ class ModelsTest(TestCase):
 
     def test_ai_generated_task_flag(self):
         self.assertTrue(self.task.ai_generated)
+
+
+class TaskListQueryCountTest(TestCase):
+    """TaskListCreate.get must not issue per-row queries."""
+
+    MAX_QUERIES = 2  # ETag aggregate + task list (the profile is cached on the user)
+
+    def setUp(self):
+        self.user_organizer = User.objects.create_user(username='organizer_user', password='123')
+        self.user_manager = User.objects.create_user(username='manager_user', password='123')
+        self.profile_organizer = UserProfile.objects.create(user=self.user_organizer, role='organizer')
+        self.profile_manager = UserProfile.objects.create(user=self.user_manager, role='manager')
+
+        self.event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        self.team = Team.objects.create(name='Tech Team', manager=self.profile_manager, event=self.event)
+        self.mission = Mission.objects.create(
+            title='Stage', event=self.event, team=self.team,
+            assigned_manager=self.profile_manager
+        )
+
+        self.staff_profiles = []
+        for i in range(10):
+            user = User.objects.create_user(username=f'staff_{i}', password='123')
+            staff = UserProfile.objects.create(user=user, role='staff')
+            self.staff_profiles.append(staff)
+            Task.objects.create(
+                title=f'Task {i}', mission=self.mission, assignee=staff,
+                team=self.team, event=self.event
+            )
+        # one task assigned directly to the manager outside their team
+        other_team = Team.objects.create(name='Other Team', event=self.event)
+        Task.objects.create(
+            title='Own task', assignee=self.profile_manager,
+            team=other_team, event=self.event
+        )
+
+        self.client = APIClient()
+
+    def _get_tasks(self, user):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(ctx.captured_queries), self.MAX_QUERIES)
+        return response.data
+
+    def test_organizer_query_count_is_bounded(self):
+        data = self._get_tasks(self.user_organizer)
+        self.assertEqual(len(data), 11)
+        self.assertEqual(data[0]['assignee_name'], 'staff_0')
+        self.assertEqual(data[0]['mission_title'], 'Stage')
+
+    def test_manager_union_query_count_is_bounded(self):
+        data = self._get_tasks(self.user_manager)
+        self.assertEqual(len(data), 11)
+        self.assertIn('Own task', [task['title'] for task in data])
+
+    def test_staff_query_count_is_bounded(self):
+        data = self._get_tasks(self.staff_profiles[0].user)
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]['team_name'], 'Tech Team')
+
+
+class ListPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='organizer_user', password='123')
+        self.profile = UserProfile.objects.create(user=self.user, role='organizer')
+        for i in range(5):
+            Company.objects.create(name=f'Company {i}', created_by=self.profile)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_plain_list_is_unchanged(self):
+        response = self.client.get('/companies/')
+        self.assertEqual(len(response.json()), 5)
+
+    def test_cursor_pages_cover_every_row_once(self):
+        page = self.client.get('/companies/', {'page_size': 2}).json()
+        names = [c['name'] for c in page['results']]
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            names.extend(c['name'] for c in page['results'])
+        self.assertEqual(names, [f'Company {i}' for i in range(5)])
+
+    def test_stream_returns_full_json_array(self):
+        response = self.client.get('/companies/', {'stream': '1'})
+        self.assertTrue(response.streaming)
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([c['name'] for c in body], [f'Company {i}' for i in range(5)])
+
+
+class MissionListTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='organizer_user', password='123')
+        self.profile = UserProfile.objects.create(user=self.user, role='organizer')
+        manager_user = User.objects.create_user(username='manager_user', password='123')
+        self.manager = UserProfile.objects.create(user=manager_user, role='manager')
+        event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        team = Team.objects.create(name='Tech Team', manager=self.manager, event=event)
+        for m in range(3):
+            mission = Mission.objects.create(
+                title=f'Mission {m}', event=event, team=team,
+                created_by=self.profile, assigned_manager=self.manager
+            )
+            for status_value in ['pending', 'pending', 'done']:
+                Task.objects.create(
+                    title='Sub', mission=mission, assignee=self.manager,
+                    team=team, event=event, status=status_value
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_nested_list_query_count_is_bounded(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/missions/', {'expand': 'subtasks'})
+        # profile + missions + prefetched subtasks
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(len(response.data[0]['subtasks']), 3)
+        self.assertEqual(response.data[0]['subtasks'][0]['assignee_name'], 'manager_user')
+
+    def test_summary_has_counts_and_no_subtasks(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/missions/', {'fields': 'summary'})
+        self.assertLessEqual(len(ctx.captured_queries), 2)
+        mission = response.data[0]
+        self.assertNotIn('subtasks', mission)
+        self.assertEqual(mission['subtask_count'], 3)
+        self.assertEqual(mission['subtask_status_counts']['pending'], 2)
+        self.assertEqual(mission['subtask_status_counts']['done'], 1)
+        self.assertEqual(mission['subtask_status_counts']['blocked'], 0)
+
+
+@override_settings(AI_JOBS_EAGER=True, AI_JOB_BACKOFF=0)
+class AISuggestMissionJobTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='organizer_user', password='123')
+        self.profile = UserProfile.objects.create(user=self.user, role='organizer')
+        manager_user = User.objects.create_user(username='manager_user', password='123')
+        self.manager = UserProfile.objects.create(user=manager_user, role='manager')
+        self.event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        team = Team.objects.create(name='Tech Team', manager=self.manager, event=self.event)
+        team.members.add(self.manager)
+        self.team = team
+        self.llm = FakeLLMClient()
+        set_llm_client(self.llm)
+        caches['ai'].clear()
+        self.client = APIClient()
+        self.login(self.user)
+
+    def login(self, user):
+        # the AI views are plain async views, so they need a real JWT
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def tearDown(self):
+        set_llm_client(None)
+
+    def test_suggest_returns_202_and_job_creates_mission(self):
+        response = self.client.post('/ai/suggest-mission/', {'event': self.event.id})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+
+        response = self.client.get(f'/ai/jobs/{job_id}/')
+        self.assertEqual(response.data['status'], 'succeeded')
+        mission = Mission.objects.get(id=response.data['result']['mission']['id'])
+        self.assertEqual(mission.title, 'Prepare venue logistics')
+        self.assertEqual(mission.assigned_manager, self.manager)
+        self.assertIn('manager_user', self.llm.prompts[0])
+
+    @override_settings(AI_JOB_MAX_RETRIES=2)
+    def test_invalid_ai_response_is_retried_then_failed(self):
+        self.llm.response = 'not json'
+        response = self.client.post('/ai/suggest-mission/', {'event': self.event.id})
+        job = AIJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(Mission.objects.count(), 0)
+
+    def test_job_is_only_visible_to_its_creator(self):
+        response = self.client.post('/ai/suggest-mission/', {'event': self.event.id})
+        self.login(self.manager.user)
+        response = self.client.get(f'/ai/jobs/{response.json()["job_id"]}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_repeated_suggestion_is_served_from_cache(self):
+        self.client.post('/ai/suggest-mission/', {'event': self.event.id})
+        self.client.post('/ai/suggest-mission/', {'event': self.event.id})
+        self.assertEqual(len(self.llm.prompts), 1)
+        self.assertEqual(Mission.objects.count(), 2)
+
+        admin_user = User.objects.create_user(username='admin_user', password='123')
+        UserProfile.objects.create(user=admin_user, role='admin')
+        self.login(admin_user)
+        stats = self.client.get('/ai/cache/stats/').data
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    @override_settings(AI_JOB_TIMEOUT=0.05, AI_JOB_MAX_RETRIES=0)
+    def test_runner_times_out_clients_that_ignore_the_timeout(self):
+        set_llm_client(HangingLLMClient())
+        response = self.client.post('/ai/suggest-mission/', {'event': self.event.id})  # async runner
+        job = AIJob.objects.get(id=response.json()['job_id'])
+        self.assertEqual((job.status, job.error), ('failed', 'LLM call did not finish within 0.05s'))
+
+        job = run_job(AIJob.objects.create(kind='suggest_mission', payload={'event': self.event.id},
+                                           created_by=self.profile).id)
+        self.assertEqual((job.status, job.error), ('failed', 'LLM call did not finish within 0.05s'))
+        self.assertEqual(Mission.objects.count(), 0)
+
+    @override_settings(AI_JOB_TIMEOUT=30, AI_JOB_MAX_RETRIES=2, AI_JOB_BACKOFF=1.0, AI_JOB_STALE_GRACE=60)
+    def test_jobs_orphaned_by_a_stopped_worker_are_failed(self):
+        self.assertEqual(stale_after(), 3 * 30 + 1 + 2 + 60)
+        make = lambda status: AIJob.objects.create(kind='suggest_mission', payload={'event': self.event.id},
+                                                   created_by=self.profile, status=status)
+        orphaned, queued, live, done = make('running'), make('queued'), make('running'), make('succeeded')
+        AIJob.objects.exclude(id=live.id).update(updated_at=timezone.now() - timedelta(seconds=154))
+
+        # polling checks the polled job only
+        response = self.client.get(f'/ai/jobs/{orphaned.id}/')
+        self.assertEqual((response.data['status'], response.data['error']), ('failed', STALE_JOB_ERROR))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'queued')
+
+        out = StringIO()
+        call_command('fail_stale_jobs', stdout=out)
+        self.assertIn('Failed 1 AI jobs', out.getvalue())
+        statuses = dict(AIJob.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[j.id] for j in (queued, live, done)], ['failed', 'running', 'succeeded'])
+
+    def test_membership_and_event_changes_invalidate_cache(self):
+        self.client.post('/ai/suggest-mission/', {'event': self.event.id})
+
+        staff_user = User.objects.create_user(username='staff_user', password='123')
+        self.team.members.add(UserProfile.objects.create(user=staff_user, role='staff'))
+        self.client.post('/ai/suggest-mission/', {'event': self.event.id})
+        self.assertEqual(len(self.llm.prompts), 2)
+
+        self.event.location = 'Jeddah'
+        self.event.save()
+        self.client.post('/ai/suggest-mission/', {'event': self.event.id})
+        self.assertEqual(len(self.llm.prompts), 3)
+
+
+class HangingLLMClient(FakeLLMClient):
+    """Ignores `timeout`, like FakeLLMClient and many dotted-path backends."""
+
+    def generate(self, prompt, model, timeout=None):
+        time.sleep(0.5)
+        return super().generate(prompt, model, timeout)
+
+    async def agenerate(self, prompt, model, timeout=None):
+        await asyncio.sleep(0.5)
+        return super().generate(prompt, model, timeout)
+
+
+class AISplitMissionTest(TestCase):
+    def setUp(self):
+        manager_user = User.objects.create_user(username='manager_user', password='123')
+        self.manager = UserProfile.objects.create(user=manager_user, role='manager')
+        event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        self.team = Team.objects.create(name='Tech Team', manager=self.manager, event=event)
+        for i in range(20):
+            user = User.objects.create_user(username=f'staff_{i}', password='123')
+            self.team.members.add(UserProfile.objects.create(user=user, role='staff'))
+        self.mission = Mission.objects.create(
+            title='Stage', description='Build the stage', event=event,
+            team=self.team, assigned_manager=self.manager
+        )
+        token = RefreshToken.for_user(manager_user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_split_uses_constant_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(f'/missions/{self.mission.id}/ai-split/')
+        self.assertEqual(response.status_code, 200)
+        subtasks = response.json()['subtasks']
+        self.assertEqual(len(subtasks), 20)
+        self.assertEqual(subtasks[0]['assignee_name'], 'staff_0')
+        # user+profile, mission, members, savepoint + bulk insert + mission update + release
+        self.assertLessEqual(len(ctx.captured_queries), 8)
+        self.assertEqual(Task.objects.filter(mission=self.mission, ai_generated=True).count(), 20)
+        self.mission.refresh_from_db()
+        self.assertTrue(self.mission.ai_split)
+
+
+class ManagerApproveTasksTest(TestCase):
+    def setUp(self):
+        manager_user = User.objects.create_user(username='manager_user', password='123')
+        self.manager = UserProfile.objects.create(user=manager_user, role='manager')
+        event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        team = Team.objects.create(name='Tech Team', manager=self.manager, event=event)
+        self.mission = Mission.objects.create(
+            title='Stage', event=event, team=team, assigned_manager=self.manager
+        )
+        self.staff = []
+        self.tasks = []
+        for i in range(10):
+            user = User.objects.create_user(username=f'staff_{i}', password='123')
+            staff = UserProfile.objects.create(user=user, role='staff')
+            self.staff.append(staff)
+            self.tasks.append(Task.objects.create(
+                title=f'Sub {i}', mission=self.mission, assignee=staff,
+                team=team, event=event, ai_generated=True
+            ))
+        self.client = APIClient()
+        self.client.force_authenticate(user=manager_user)
+
+    def test_batch_is_applied_in_constant_queries(self):
+        updates = [
+            {'id': task.id, 'title': f'Edited {task.id}', 'assignee': 'staff_0'}
+            for task in self.tasks
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch(
+                f'/missions/{self.mission.id}/approve/', {'updates': updates}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(ctx.captured_queries), 10)
+        self.assertEqual(
+            Task.objects.filter(mission=self.mission, assignee=self.staff[0]).count(), 10)
+        self.mission.refresh_from_db()
+        self.assertTrue(self.mission.is_approved)
+
+    def test_invalid_entries_are_reported_and_nothing_is_saved(self):
+        updates = [
+            {'id': self.tasks[0].id, 'title': 'Edited'},
+            {'id': 999999, 'title': 'Missing'},
+            {'id': self.tasks[1].id, 'assignee': 'nobody'},
+        ]
+        response = self.client.patch(
+            f'/missions/{self.mission.id}/approve/', {'updates': updates}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['index'] for e in response.data['errors']], [1, 2])
+        self.tasks[0].refresh_from_db()
+        self.assertEqual(self.tasks[0].title, 'Sub 0')
+        self.mission.refresh_from_db()
+        self.assertFalse(self.mission.is_approved)
+
+
+    def test_wrongly_typed_entries_are_reported_not_a_500(self):
+        updates = [
+            {'id': [self.tasks[0].id]},
+            {'id': self.tasks[0].id, 'assignee': {'username': 'staff_0'}},
+            {'id': self.tasks[1].id, 'title': ['Edited']},
+            {'id': True},
+            {'id': self.tasks[1].id, 'title': 'x' * 201},
+        ]
+        response = self.client.patch(
+            f'/missions/{self.mission.id}/approve/', {'updates': updates}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['error'] for e in response.data['errors']], [
+            'id must be an integer', 'assignee must be a username', 'title must be a string',
+            'id must be an integer', 'title must be at most 200 characters',
+        ])
+
+class ProfileResolutionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='staff_user', password='123')
+        self.profile = UserProfile.objects.create(user=self.user, role='staff')
+        self.client = APIClient()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_profile_is_loaded_with_the_jwt_user(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/profiles/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.profile.id)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_role_change_is_visible_on_next_request(self):
+        self.assertEqual(self.client.get('/profiles/me/').data['role'], 'staff')
+        self.profile.role = 'manager'
+        self.profile.save()
+        self.assertEqual(self.client.get('/profiles/me/').data['role'], 'manager')
+
+
+class TaskPermissionTest(TestCase):
+    def setUp(self):
+        self.manager_user = User.objects.create_user(username='manager_user', password='123')
+        self.manager = UserProfile.objects.create(user=self.manager_user, role='manager')
+        other_user = User.objects.create_user(username='other_manager', password='123')
+        self.other_manager = UserProfile.objects.create(user=other_user, role='manager')
+        event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        self.team = Team.objects.create(name='Tech Team', manager=self.manager, event=event)
+        self.task = Task.objects.create(title='Sub', team=self.team, event=event)
+        self.client = APIClient()
+
+    def test_team_manager_can_edit_task(self):
+        self.client.force_authenticate(user=self.manager_user)
+        response = self.client.patch(f'/tasks/{self.task.id}/', {'title': 'Edited'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_other_manager_cannot_edit_or_delete_task(self):
+        self.client.force_authenticate(user=self.other_manager.user)
+        response = self.client.patch(f'/tasks/{self.task.id}/', {'title': 'Edited'}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'error': 'You cannot edit this task'})
+        response = self.client.delete(f'/tasks/{self.task.id}/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'error': 'You cannot delete this task'})
+
+    def test_manager_change_invalidates_access_index(self):
+        self.client.force_authenticate(user=self.other_manager.user)
+        self.assertEqual(self.client.delete(f'/tasks/{self.task.id}/').status_code, 403)
+        self.team.manager = self.other_manager
+        self.team.save()
+        self.assertEqual(self.client.delete(f'/tasks/{self.task.id}/').status_code, 204)
+
+    def test_only_organizers_can_create_tasks(self):
+        self.client.force_authenticate(user=self.manager_user)
+        response = self.client.post('/tasks/', {'title': 'New', 'event': self.task.event_id})
+        self.assertEqual(response.status_code, 403)
+
+    def test_denials_keep_the_error_body(self):
+        self.client.force_authenticate(user=self.manager_user)
+        mission = Mission.objects.create(title='Setup', event=self.task.event, team=self.team)
+        denied = {
+            ('post', '/teams/'): 'Only organizers can create teams',
+            ('patch', f'/teams/{self.team.id}/'): 'Only organizer or admin can edit this team',
+            ('delete', f'/teams/{self.team.id}/'): 'Only organizer or admin can delete this team',
+            ('delete', f'/teams/{self.team.id}/delete/'): 'Only organizer or admin can delete this team',
+            ('post', f'/teams/{self.team.id}/add-member/'): 'Not authorized',
+            ('post', '/missions/'): 'Only organizers can create missions',
+            ('delete', f'/missions/{mission.id}/'): 'Only organizers or admins can delete missions',
+            ('delete', f'/missions/{mission.id}/delete/'): 'Only organizers or admins can delete missions',
+            ('patch', '/profiles/1/'): 'Admin only',
+        }
+        for (method, url), message in denied.items():
+            response = getattr(self.client, method)(url, {}, format='json')
+            self.assertEqual((response.status_code, response.json()), (403, {'error': message}), url)
+
+        staff_user = User.objects.create_user(username='staff_user', password='123')
+        UserProfile.objects.create(user=staff_user, role='staff')
+        self.client.force_authenticate(user=staff_user)
+        response = self.client.patch(f'/missions/{mission.id}/approve/', {}, format='json')
+        self.assertEqual(response.json(), {'error': 'Only managers can approve tasks'})
+
+
+class BenchIndexesCommandTest(TestCase):
+    SMALL = ['--seed', '--companies=1', '--events=1', '--teams=1', '--members=2',
+             '--missions=1', '--tasks=2', '--repeat=1']
+
+    def index_names(self):
+        with connection.cursor() as cursor:
+            return {name for name, info in connection.introspection.get_constraints(
+                cursor, Task._meta.db_table).items() if info['index']}
+
+    def test_seed_and_compare_leave_no_trace(self):
+        indexes = self.index_names()
+        out = StringIO()
+        call_command('bench_indexes', '--compare', *self.SMALL, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['tasks'], 2)
+        self.assertEqual(set(report['before']), set(report['after']))
+        self.assertEqual(Task.objects.count(), 0)
+        self.assertEqual(self.index_names(), indexes)
+
+    def test_refuses_a_real_database_without_force(self):
+        with mock.patch('main_app.management.commands.bench_indexes.is_test_database', return_value=False):
+            with self.assertRaisesMessage(CommandError, 'pass --force'):
+                call_command('bench_indexes', *self.SMALL, stdout=StringIO())
+            call_command('bench_indexes', '--force', *self.SMALL, stdout=StringIO())
+        self.assertEqual(Task.objects.count(), 0)
+
+
+class BenchApiCommandTest(TestCase):
+    @staticmethod
+    def shape(path):
+        """'tasks/<int:pk>/' and '/tasks/{pk}/?x=1' both become 'tasks/*/'."""
+        return re.sub(r'<[^>]+>|\{[^}]+\}', '*', str(path).split('?')[0].lstrip('/'))
+
+    def test_every_route_succeeds_on_a_small_tenant(self):
+        out = StringIO()
+        call_command(
+            'bench_api', iterations=1, events=1, teams=1, members=2, missions=1, tasks=2,
+            stdout=out
+        )
+        report = json.loads(out.getvalue())
+        # every URL pattern is benchmarked, compared by path shape
+        self.assertEqual({self.shape(pattern.pattern) for pattern in urlpatterns} -
+                         {self.shape(route['path']) for route in report['routes'].values()}, set())
+        for name, route in report['routes'].items():
+            if route['expected_status']:
+                self.assertEqual(route['status'], [route['expected_status']], name)
+            else:
+                self.assertTrue(all(200 <= code < 300 for code in route['status']), name)
+            self.assertIn('p99_ms', route)
+        # the benchmark rolls back everything it created
+        self.assertEqual(Task.objects.count(), 0)
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin_user', password='123')
+        UserProfile.objects.create(user=self.user, role='admin')
+        for i in range(3):
+            Company.objects.create(name=f'Company {i}')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        aggregator.reset()
+
+    def test_in_lists_share_a_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 WHERE id IN (%s, %s, %s)'),
+            fingerprint('SELECT 1 WHERE id IN (%s)')
+        )
+
+    def test_server_timing_header_and_admin_report(self):
+        response = self.client.get('/companies/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+
+        report = self.client.get('/instrumentation/').data
+        views = {v['view']: v for v in report['slowest_views']}
+        self.assertEqual(views['main_app.views.CompanyListCreate']['requests'], 1)
+        self.assertEqual(report['database']['vendor'], connection.vendor)
+        self.assertIn('pool', report['database'])
+
+    async def test_async_requests_count_their_queries(self):
+        # the ORM runs in sync_to_async threads, on their own connections
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        response = await AsyncClient().get('/companies/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        view = aggregator.report()['slowest_views'][0]
+        self.assertEqual(view['view'], 'main_app.views.CompanyListCreate')
+        self.assertGreater(view['avg_queries'], 0)
+        self.assertIn('queries"', response['Server-Timing'])
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+
+    def test_server_timing_is_for_admins_only(self):
+        staff_user = User.objects.create_user(username='staff_user', password='123')
+        UserProfile.objects.create(user=staff_user, role='staff')
+        self.client.force_authenticate(user=staff_user)
+        response = self.client.get('/companies/')
+        self.assertNotIn('Server-Timing', response)
+        # still recorded for the admin report
+        self.assertEqual(aggregator.report()['slowest_views'][0]['requests'], 1)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_recorded(self):
+        response = self.client.get('/companies/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(aggregator.report()['slowest_views'], [])
+
+
+class AIProviderStartupTest(TestCase):
+    def tearDown(self):
+        set_llm_client(None)
+
+    def test_booting_the_app_does_not_import_the_gemini_sdk(self):
+        self.assertFalse(run_snippet(STARTUP_SNIPPET)['sdk_imported'])
+
+    @override_settings(AI_LLM_BACKEND='main_app.ai_service.FakeLLMClient')
+    def test_backend_can_be_a_dotted_path(self):
+        set_llm_client(None)
+        self.assertIsInstance(get_llm_client(), FakeLLMClient)
+
+
+class SlowAsyncLLMClient(FakeLLMClient):
+    """Sleeps on the loop and records how many calls overlapped."""
+
+    def __init__(self):
+        super().__init__()
+        self.in_flight = self.max_in_flight = 0
+
+    async def agenerate(self, prompt, model, timeout=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return self.generate(prompt, model, timeout)
+
+
+class AsyncAIViewTest(TestCase):
+    def tearDown(self):
+        set_llm_client(None)
+
+    @override_settings(AI_MAX_CONCURRENT_CALLS=3)
+    async def test_semaphore_caps_concurrent_llm_calls(self):
+        llm = SlowAsyncLLMClient()
+        set_llm_client(llm)
+        replies = await asyncio.gather(*(agenerate(f'prompt {i}', model='m') for i in range(20)))
+        self.assertEqual(len(replies), 20)
+        self.assertEqual(llm.max_in_flight, 3)
+
+    def test_ai_views_require_a_jwt(self):
+        self.assertEqual(self.client.post('/ai/suggest-mission/', {'event': 1}).status_code, 401)
+        self.assertEqual(self.client.post('/missions/1/ai-split/').status_code, 401)
+        response = self.client.post('/ai/suggest-mission/', HTTP_AUTHORIZATION='Bearer nope')
+        self.assertEqual(response.status_code, 401)
+
+    def test_ai_views_are_post_only(self):
+        self.assertEqual(self.client.get('/ai/suggest-mission/').status_code, 405)
+
+    @override_settings(SERVER_MODE='asgi', AI_JOBS_EAGER=False)
+    async def test_asgi_enqueue_runs_the_job_on_the_loop(self):
+        marker = contextvars.ContextVar('marker')
+        marker.set('request')
+        seen = []
+
+        async def fake_run(job_id):
+            seen.append((job_id, marker.get(None)))
+
+        with mock.patch('main_app.jobs.arun_job', fake_run), \
+                mock.patch('main_app.jobs.close_old_connections'):
+            job = AIJob(id=7)
+            self.assertIs(await aenqueue(job), job)
+            await asyncio.gather(*_loop_tasks)
+        # ran, and in a fresh context rather than the request's
+        self.assertEqual(seen, [(7, None)])
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='organizer_user', password='123')
+        self.profile = UserProfile.objects.create(user=user, role='organizer')
+        self.company = Company.objects.create(name='Acme', created_by=self.profile)
+        Event.objects.create(title='Expo', date=date(2025, 11, 10), company=self.company)
+        caches['responses'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+
+    def test_repeat_get_skips_queries_and_serializer(self):
+        first = self.client.get('/events/')
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get('/events/')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_returns_304_without_body(self):
+        etag = self.client.get(f'/companies/{self.company.id}/')['ETag']
+        response = self.client.get(f'/companies/{self.company.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_query_params_are_cached_separately(self):
+        self.assertEqual(len(self.client.get('/events/').json()), 1)
+        self.assertIn('results', self.client.get('/events/', {'page_size': 1}).json())
+
+    def test_writes_invalidate_cached_responses(self):
+        etag = self.client.get('/events/')['ETag']
+        self.company.name = 'Acme Corp'
+        self.company.save()
+        response = self.client.get('/events/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['company_name'], 'Acme Corp')
+
+        Event.objects.create(title='Summit', date=date(2025, 12, 1))
+        self.assertEqual(len(self.client.get('/events/').json()), 2)
+        Event.objects.get(title='Summit').delete()
+        self.assertEqual(len(self.client.get('/events/').json()), 1)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        manager_user = User.objects.create_user(username='manager_user', password='123')
+        self.manager = UserProfile.objects.create(user=manager_user, role='manager')
+        staff_user = User.objects.create_user(username='staff_user', password='123')
+        self.staff = UserProfile.objects.create(user=staff_user, role='staff')
+        event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        self.team = Team.objects.create(name='Tech Team', manager=self.manager, event=event)
+        self.team.members.add(self.staff)
+        self.mission = Mission.objects.create(title='Stage', event=event, team=self.team,
+                                              assigned_manager=self.manager)
+        self.task = Task.objects.create(title='Build', mission=self.mission, assignee=self.staff,
+                                        team=self.team, event=event)
+        self.other_task = Task.objects.create(title='Other', event=event)
+        self.client = APIClient()
+        self.client.force_authenticate(user=staff_user)
+
+    def assertNotModified(self, path, etag):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(len(ctx.captured_queries), 1)  # the aggregate only
+
+    def test_unchanged_task_list_and_detail_return_304(self):
+        for path in ('/tasks/', f'/tasks/{self.task.id}/'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('Last-Modified', response)
+            self.assertNotModified(path, response['ETag'])
+
+    def test_deleting_an_older_row_is_not_a_304(self):
+        Task.objects.create(title='Newer', assignee=self.staff, event=self.mission.event)
+        etag = self.client.get('/tasks/')['ETag']
+        self.task.delete()  # max(updated_at) stays the same
+        # If-Modified-Since is not answered at all; the ETag changes
+        since = http_date(time.time() + 60)
+        self.assertEqual(self.client.get('/tasks/', HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+        self.assertEqual(self.client.get('/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_status_update_changes_etag(self):
+        etag = self.client.get('/tasks/')['ETag']
+        self.client.patch(f'/tasks/{self.task.id}/update-status/', {'status': 'done'})
+        response = self.client.get('/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['status'], 'done')
+
+    def test_mission_etag_follows_subtasks_and_related_rows(self):
+        etag = self.client.get('/missions/')['ETag']
+        self.assertNotModified('/missions/', etag)
+        self.task.status = 'in_progress'
+        self.task.save()
+        response = self.client.get('/missions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.team.name = 'Stage Crew'
+        self.team.save()
+        response = self.client.get(f'/missions/{self.mission.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data['team_name'], 'Stage Crew')
+
+    def test_membership_change_touches_team(self):
+        etag = self.client.get('/teams/')['ETag']
+        user = User.objects.create_user(username='new_staff', password='123')
+        self.team.members.add(UserProfile.objects.create(user=user, role='staff'))
+        self.assertEqual(self.client.get('/teams/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pages_and_streams_skip_the_fingerprint(self):
+        for params in ({'page_size': 1}, {'stream': 1}):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/tasks/', params)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('ETag', response)
+            self.assertFalse(any('MAX(' in q['sql'].upper() for q in ctx.captured_queries), params)
+
+    def test_detail_is_scoped_like_the_list(self):
+        self.assertEqual(self.client.get(f'/tasks/{self.other_task.id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/missions/{self.mission.id}/').status_code, 200)
+
+
+class DeltaSyncTest(TestCase):
+    def setUp(self):
+        manager_user = User.objects.create_user(username='manager_user', password='123')
+        self.manager = UserProfile.objects.create(user=manager_user, role='manager')
+        staff_user = User.objects.create_user(username='staff_user', password='123')
+        self.staff = UserProfile.objects.create(user=staff_user, role='staff')
+        event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        self.team = Team.objects.create(name='Tech Team', manager=self.manager, event=event)
+        self.team.members.add(self.staff)
+        self.mission = Mission.objects.create(title='Stage', event=event, team=self.team,
+                                              assigned_manager=self.manager)
+        self.tasks = [
+            Task.objects.create(title=f'Task {i}', mission=self.mission, assignee=self.staff,
+                                team=self.team, event=event)
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=staff_user)
+
+    def sync(self, path, cursor):
+        response = self.client.get(path, {'since': cursor})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    @override_settings(DELTA_SYNC_LAG=0)
+    def test_only_changes_after_the_cursor_are_returned(self):
+        first = self.sync('/tasks/', '0')
+        self.assertEqual(len(first['changed']), 3)
+        self.assertEqual(first['deleted'], [])
+
+        self.assertEqual(self.sync('/tasks/', first['cursor'])['changed'], [])
+
+        self.client.patch(f'/tasks/{self.tasks[0].id}/update-status/', {'status': 'done'})
+        deleted_id = self.tasks[1].id
+        self.tasks[1].delete()
+        delta = self.sync('/tasks/', first['cursor'])
+        self.assertEqual([t['id'] for t in delta['changed']], [self.tasks[0].id])
+        self.assertEqual(delta['changed'][0]['status'], 'done')
+        self.assertEqual(delta['deleted'], [deleted_id])
+
+    @override_settings(DELTA_SYNC_LAG=0)
+    def test_subtask_changes_mark_the_mission_changed(self):
+        cursor = self.sync('/missions/', '0')['cursor']
+        self.tasks[2].delete()
+        delta = self.sync('/missions/', cursor)
+        self.assertEqual([m['id'] for m in delta['changed']], [self.mission.id])
+        self.assertEqual(len(delta['changed'][0]['subtasks']), 2)
+
+        cursor = delta['cursor']
+        mission_id = self.mission.id
+        self.mission.delete()
+        self.assertEqual(self.sync('/missions/', cursor)['deleted'], [mission_id])
+
+    @override_settings(DELTA_SYNC_LAG=0)
+    def test_deletes_are_scoped_like_the_list(self):
+        cursor = self.sync('/tasks/', '0')['cursor']
+        other = Task.objects.create(title='Not mine', event=self.mission.event)
+        other_id = other.id
+        other.delete()
+        self.assertEqual(self.sync('/tasks/', cursor)['deleted'], [])
+        self.assertTrue(Tombstone.objects.filter(model='task', object_id=other_id).exists())
+
+    @override_settings(DELTA_SYNC_LAG=0)
+    def test_cascades_write_tombstones_in_bulk(self):
+        # no receivers on task deletes, so cascades can use fast delete
+        self.assertTrue(Collector(using='default').can_fast_delete(Task.objects.all()))
+        cursor = self.sync('/tasks/', '0')['cursor']
+        task_ids = sorted(task.id for task in self.tasks)
+        with CaptureQueriesContext(connection) as queries:
+            self.mission.event.delete()
+        inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.sync('/tasks/', cursor)['deleted'], task_ids)
+        # event, team and mission are all roots; each row is recorded once
+        self.assertEqual(sorted(Tombstone.objects.filter(model='task').values_list('object_id', flat=True)),
+                         task_ids)
+        self.assertEqual(Tombstone.objects.filter(model='mission').count(), 1)
+
+    @override_settings(DELTA_SYNC_LAG=0)
+    def test_reassigned_tasks_leave_the_old_assignees_scope(self):
+        cursor = self.sync('/tasks/', '0')['cursor']
+        other = UserProfile.objects.create(user=User.objects.create_user(username='other', password='123'),
+                                           role='staff')
+        self.tasks[0].assignee = other
+        self.tasks[0].save()
+        delta = self.sync('/tasks/', cursor)
+        self.assertEqual(delta['changed'], [])
+        self.assertEqual(delta['deleted'], [self.tasks[0].id])
+
+        # the team's manager still sees it, as a change
+        self.client.force_authenticate(user=self.manager.user)
+        delta = self.sync('/tasks/', cursor)
+        self.assertEqual([t['id'] for t in delta['changed']], [self.tasks[0].id])
+        self.assertEqual(delta['deleted'], [])
+
+    @override_settings(DELTA_SYNC_LAG=0)
+    def test_approve_reassignments_leave_the_old_assignees_scope(self):
+        Task.objects.filter(mission=self.mission).update(ai_generated=True)
+        cursor = self.sync('/tasks/', '0')['cursor']
+        other = UserProfile.objects.create(user=User.objects.create_user(username='other', password='123'),
+                                           role='staff')
+        self.client.force_authenticate(user=self.manager.user)
+        response = self.client.patch(f'/missions/{self.mission.id}/approve/', {
+            'updates': [{'id': self.tasks[1].id, 'assignee': 'other'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.tasks[1].refresh_from_db()
+        self.assertEqual(self.tasks[1].assignee, other)
+        self.client.force_authenticate(user=self.staff.user)
+        self.assertEqual(self.sync('/tasks/', cursor)['deleted'], [self.tasks[1].id])
+
+    @override_settings(DELTA_SYNC_LAG=0)
+    def test_missions_moved_to_another_team_leave_its_scope(self):
+        cursor = self.sync('/missions/', '0')['cursor']
+        self.mission.team = Team.objects.create(name='Other Team', manager=self.manager,
+                                                event=self.mission.event)
+        self.mission.save()
+        self.assertEqual(self.sync('/missions/', cursor)['deleted'], [self.mission.id])
+
+    def test_bad_and_expired_cursors(self):
+        self.assertEqual(self.client.get('/tasks/', {'since': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/tasks/', {'since': '1000000'}).status_code, 410)
+
+
+class PushChannelTest(TestCase):
+    def setUp(self):
+        set_broker(InProcessBroker())
+        manager_user = User.objects.create_user(username='manager_user', password='123')
+        self.manager = UserProfile.objects.create(user=manager_user, role='manager')
+        staff_user = User.objects.create_user(username='staff_user', password='123')
+        self.staff = UserProfile.objects.create(user=staff_user, role='staff')
+        self.event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        self.team = Team.objects.create(name='Tech Team', manager=self.manager, event=self.event)
+        self.team.members.add(self.staff)
+        self.mission = Mission.objects.create(title='Stage', event=self.event, team=self.team,
+                                              assigned_manager=self.manager)
+        self.task = Task.objects.create(title='Build', mission=self.mission, assignee=self.staff,
+                                        team=self.team, event=self.event)
+        self.other_task = Task.objects.create(title='Other', event=self.event)
+        self.token = str(RefreshToken.for_user(staff_user).access_token)
+        self.ticket = self.client.post('/tasks/events/ticket/', HTTP_AUTHORIZATION=f'Bearer {self.token}').data['ticket']
+
+    def tearDown(self):
+        set_broker(None)
+
+    async def open_stream(self, query=''):
+        response = await self.async_client.get(f'/tasks/events/?ticket={self.ticket}{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertIn(b'retry:', await anext(stream))
+        return stream
+
+    def set_status(self, task, status):
+        with self.captureOnCommitCallbacks(execute=True):
+            task.status = status
+            task.save()
+
+    async def test_status_change_is_pushed_to_the_assignee_only(self):
+        stream = await self.open_stream()
+        await sync_to_async(self.set_status)(self.other_task, 'done')  # not visible to staff
+        await sync_to_async(self.set_status)(self.task, 'in_progress')
+        chunk = (await anext(stream)).decode()
+        self.assertIn('event: task.status', chunk)
+        data = json.loads(chunk.split('data: ', 1)[1])
+        self.assertEqual((data['task'], data['status'], data['previous']),
+                         (self.task.id, 'in_progress', 'pending'))
+
+    async def test_mission_approval_reaches_team_members(self):
+        stream = await self.open_stream(f'&event={self.event.id}')
+
+        def approve():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.mission.is_approved = True
+                self.mission.save(update_fields=['is_approved', 'updated_at'])
+        await sync_to_async(approve)()
+        self.assertIn(b'event: mission.approved', await anext(stream))
+
+    async def test_stream_requires_a_valid_ticket_or_token(self):
+        response = await self.async_client.get('/tasks/events/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(f'/tasks/events/?ticket={self.ticket}x')
+        self.assertEqual(response.status_code, 401)
+        # the JWT is not accepted in the URL
+        response = await self.async_client.get(f'/tasks/events/?token={self.token}')
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(PUSH_TICKET_TTL=0)
+    async def test_expired_ticket_is_rejected(self):
+        await asyncio.sleep(1.01)
+        response = await self.async_client.get(f'/tasks/events/?ticket={self.ticket}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_wsgi_gets_501_instead_of_a_stream_that_never_flushes(self):
+        response = self.client.get(f'/tasks/events/?ticket={self.ticket}')
+        self.assertEqual(response.status_code, 501)
+
+    @override_settings(PUSH_QUEUE_SIZE=2)
+    async def test_slow_consumer_gets_resync_instead_of_a_backlog(self):
+        broker = get_broker()
+        subscription = broker.subscribe({'all'})
+        for i in range(5):
+            broker.publish(['all'], {'type': 'task.status', 'task': i})
+        await asyncio.sleep(0)  # let the loop run the deliveries
+        self.assertIs(await subscription.get(timeout=1), OVERFLOW)
+        self.assertEqual(subscription.queue.qsize(), 0)
+        broker.publish(['all'], {'type': 'task.status', 'task': 9})
+        self.assertIsNone(await subscription.get(timeout=0.01))
+
+
+class TeamSerializerQueryCountTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='organizer_user', password='123')
+        UserProfile.objects.create(user=self.user, role='organizer')
+        self.event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def add_teams(self, teams, members):
+        for t in range(teams):
+            manager_user = User.objects.create_user(username=f'manager_{t}_{teams}', password='123')
+            manager = UserProfile.objects.create(user=manager_user, role='manager')
+            team = Team.objects.create(name=f'Team {t}', manager=manager, event=self.event,
+                                       created_by=manager)
+            for m in range(members):
+                user = User.objects.create_user(username=f'staff_{t}_{m}_{teams}', password='123')
+                team.members.add(UserProfile.objects.create(user=user, role='staff'))
+
+    def count_queries(self, path):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data
+
+    def test_list_query_count_does_not_grow_with_teams_or_members(self):
+        self.add_teams(2, 2)
+        small, _ = self.count_queries('/teams/')
+        self.add_teams(5, 6)
+        large, data = self.count_queries('/teams/')
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 3)  # ETag aggregate, teams, members + users
+        self.assertEqual(len(data), 7)
+        self.assertEqual(data[-1]['member_names'][0], 'staff_4_0_5')
+
+    def test_summary_returns_member_counts(self):
+        self.add_teams(3, 4)
+        queries, data = self.count_queries('/teams/?fields=summary')
+        self.assertLessEqual(queries, 2)
+        self.assertEqual([team['member_count'] for team in data], [4, 4, 4])
+        self.assertNotIn('member_names', data[0])
+
+    def test_detail(self):
+        self.add_teams(1, 3)
+        team = Team.objects.get()
+        queries, data = self.count_queries(f'/teams/{team.id}/')
+        self.assertLessEqual(queries, 3)
+        self.assertEqual(len(data['members']), 3)
+        self.assertEqual(data['manager_name'], 'manager_0_1')
+
+
+class TeamMembersBulkTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='organizer_user', password='123')
+        UserProfile.objects.create(user=user, role='organizer')
+        self.event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        self.team = Team.objects.create(name='Tech Team', event=self.event)
+        self.staff = []
+        for i in range(30):
+            staff_user = User.objects.create_user(username=f'staff_{i}', password='123')
+            self.staff.append(UserProfile.objects.create(user=staff_user, role='staff'))
+        self.team.members.add(*self.staff[:5])
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+
+    def patch(self, data):
+        return self.client.patch(f'/teams/{self.team.id}/members/', data, format='json')
+
+    def test_adds_and_removes_in_constant_queries(self):
+        add = [p.id for p in self.staff[3:30]]
+        remove = [p.id for p in self.staff[:2]]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.patch({'add': add, 'remove': remove})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added'], [p.id for p in self.staff[5:30]])
+        self.assertEqual(response.data['removed'], remove)
+        self.assertEqual(response.data['member_count'], 28)
+        self.assertEqual(self.team.members.count(), 28)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_unknown_ids_reject_the_whole_batch(self):
+        response = self.patch({'add': [self.staff[10].id, 99999], 'remove': [self.staff[0].id]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['ids'], [99999])
+        self.assertEqual(self.team.members.count(), 5)
+
+    def test_bad_payloads(self):
+        self.assertEqual(self.patch({'add': 'x'}).status_code, 400)
+        same = self.staff[0].id
+        self.assertEqual(self.patch({'add': [same], 'remove': [same]}).status_code, 400)
+
+    def test_membership_signals_still_run(self):
+        manager_user = User.objects.create_user(username='manager_user', password='123')
+        manager = UserProfile.objects.create(user=manager_user, role='manager')
+        staff = self.staff[20]
+        get_access_index(staff)  # cache the index before the change
+        self.patch({'add': [staff.id, manager.id]})
+        self.assertIn(self.team.id, get_access_index(staff).member_team_ids)
+
+
+class BulkImportExportTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='organizer_user', password='123')
+        self.organizer = UserProfile.objects.create(user=user, role='organizer')
+        manager_user = User.objects.create_user(username='manager_user', password='123')
+        self.manager = UserProfile.objects.create(user=manager_user, role='manager')
+        staff_user = User.objects.create_user(username='staff_user', password='123')
+        self.staff = UserProfile.objects.create(user=staff_user, role='staff')
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+
+    def import_lines(self, rows, path='/bulk/import/'):
+        body = '\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows)
+        return self.client.post(path, body, content_type='application/x-ndjson')
+
+    def test_import_resolves_refs_and_existing_ids(self):
+        tasks = [{'type': 'task', 'title': f'Task {i}', 'event': 'expo', 'team': 'tech',
+                  'mission': 'setup', 'assignee': self.staff.id} for i in range(200)]
+        rows = [
+            {'type': 'event', 'ref': 'expo', 'title': 'AI Expo', 'date': '2030-01-01'},
+            {'type': 'team', 'ref': 'tech', 'name': 'Tech', 'event': 'expo',
+             'manager': self.manager.id, 'members': [self.staff.id]},
+            {'type': 'mission', 'ref': 'setup', 'title': 'Setup', 'event': 'expo', 'team': 'tech'},
+        ] + tasks
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.import_lines(rows)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], {'event': 1, 'team': 1, 'mission': 1, 'task': 200})
+        self.assertEqual(response.data['errors'], [])
+        self.assertLess(len(ctx.captured_queries), 20)  # not one per row
+
+        team = Team.objects.get(name='Tech')
+        self.assertEqual(list(team.members.all()), [self.staff])
+        self.assertEqual(team.created_by, self.organizer)
+        task = Task.objects.filter(title='Task 7').get()
+        self.assertEqual((task.event.title, task.team, task.mission.title, task.assignee),
+                         ('AI Expo', team, 'Setup', self.staff))
+        self.assertIsNotNone(task.updated_at)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        event = Event.objects.create(title='Expo', date=date(2030, 1, 1))
+        rows = [
+            {'type': 'task', 'title': 'ok', 'event': event.id},
+            {'type': 'task', 'title': 'bad ref', 'event': 'missing'},
+            {'type': 'task', 'title': 'bad id', 'event': 99999},
+            {'type': 'event', 'title': 'no date'},
+            {'type': 'sponsor', 'name': 'x'},
+            'not json',
+            {'type': 'task', 'ref': '12', 'title': 'numeric ref', 'event': event.id},
+        ]
+        response = self.import_lines(rows)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created']['task'], 1)
+        errors = {error['line']: error for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [2, 3, 4, 5, 6, 7])
+        self.assertIn('Unknown ref', str(errors[2]['errors']['event']))
+        self.assertIn('date', errors[4]['errors'])
+        self.assertIn('ref', errors[7]['errors'])
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_csv_import_with_default_type(self):
+        event = Event.objects.create(title='Expo', date=date(2030, 1, 1))
+        body = (
+            'name,event,manager,members\n'
+            f'Ops,{event.id},{self.manager.id},{self.staff.id};{self.manager.id}\n'
+            f'Stage,{event.id},,\n'
+        )
+        response = self.client.post('/bulk/import/?type=team', body, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created']['team'], 2)
+        self.assertEqual(Team.objects.get(name='Ops').members.count(), 2)
+        self.assertIsNone(Team.objects.get(name='Stage').manager)
+
+    def test_import_invalidates_access_index(self):
+        event = Event.objects.create(title='Expo', date=date(2030, 1, 1))
+        self.assertEqual(get_access_index(self.staff).member_team_ids, frozenset())
+        self.import_lines([{'type': 'team', 'name': 'Ops', 'event': event.id, 'members': [self.staff.id]}])
+        self.assertEqual(len(get_access_index(self.staff).member_team_ids), 1)
+
+    def test_export_streams_importable_rows(self):
+        event = Event.objects.create(title='Expo', date=date(2030, 1, 1))
+        other = Event.objects.create(title='Other', date=date(2030, 1, 1))
+        team = Team.objects.create(name='Ops', event=event)
+        team.members.add(self.staff)
+        mission = Mission.objects.create(title='Setup', event=event, team=team)
+        Task.objects.create(title='Badges', event=event, team=team, mission=mission)
+        Task.objects.create(title='Elsewhere', event=other)
+
+        response = self.client.get(f'/bulk/export/?event={event.id}')
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['type'] for row in rows], ['event', 'team', 'mission', 'task'])
+        self.assertEqual(rows[1]['members'], [self.staff.id])
+        self.assertNotIn('subtasks', rows[2])
+
+        response = self.import_lines(rows)
+        self.assertEqual(response.data['created'], {'event': 1, 'team': 1, 'mission': 1, 'task': 1})
+        self.assertEqual(Task.objects.filter(title='Badges').count(), 2)
+
+    def test_csv_export(self):
+        event = Event.objects.create(title='Expo', date=date(2030, 1, 1))
+        team = Team.objects.create(name='Ops', event=event)
+        team.members.add(self.staff, self.manager)
+        response = self.client.get('/bulk/export/?type=team&as=csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('type,id,name'))
+        member_ids = sorted([self.staff.id, self.manager.id])
+        self.assertIn(f'{member_ids[0]};{member_ids[1]}', lines[1])
+        self.assertEqual(self.client.get('/bulk/export/?as=csv').status_code, 400)
+        self.assertEqual(self.client.get('/bulk/export/?type=sponsor').status_code, 400)
+
+    def test_staff_cannot_import(self):
+        self.client.force_authenticate(user=self.staff.user)
+        self.assertEqual(self.import_lines([]).status_code, 403)
+        self.assertEqual(self.client.get('/bulk/export/').status_code, 403)
+
+    def test_management_commands_round_trip(self):
+        event = Event.objects.create(title='Expo', date=date(2030, 1, 1))
+        Task.objects.create(title='Badges', event=event)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'tasks.csv')
+            call_command('bulk_export', path, type='task', format='csv')
+            out = StringIO()
+            call_command('bulk_import', path, user='organizer_user', batch_size=1, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['created']['task'], 1)
+        self.assertEqual(Task.objects.filter(title='Badges', created_by=self.organizer).count(), 1)
+
+
+class EventStatsTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        user = User.objects.create_user(username='organizer_user', password='123')
+        self.organizer = UserProfile.objects.create(user=user, role='organizer')
+        self.event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        self.team_a = Team.objects.create(name='A', event=self.event)
+        self.team_b = Team.objects.create(name='B', event=self.event)
+        self.mission = Mission.objects.create(title='Setup', event=self.event, team=self.team_a, is_approved=True)
+        Mission.objects.create(title='Empty', event=self.event, team=self.team_b, status='done')
+        for status_value in ('pending', 'done', 'done'):
+            Task.objects.create(title='t', event=self.event, team=self.team_a, mission=self.mission,
+                                status=status_value)
+        Task.objects.create(title='loose', event=self.event, team=self.team_b, status='blocked')
+        Task.objects.create(title='no team', event=self.event)
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+
+    def stats(self, event_id=None):
+        return self.client.get(f'/events/{event_id or self.event.id}/stats/')
+
+    def test_counts_by_event_team_and_mission(self):
+        data = self.stats().data
+        self.assertEqual(data['tasks'], {'total': 5, 'pending': 2, 'in_progress': 0, 'done': 2, 'blocked': 1})
+        self.assertEqual(data['progress'], 0.4)
+        self.assertEqual((data['missions']['total'], data['missions']['done'], data['missions']['approved']),
+                         (2, 1, 1))
+        by_team = {entry['team']: entry for entry in data['by_team']}
+        self.assertEqual(list(by_team), [None, self.team_a.id, self.team_b.id])
+        self.assertEqual(by_team[self.team_a.id]['tasks']['done'], 2)
+        self.assertEqual(by_team[self.team_b.id]['missions']['total'], 1)
+        by_mission = {entry['mission']: entry for entry in data['by_mission']}
+        self.assertEqual(by_mission[self.mission.id]['progress'], round(2 / 3, 4))
+        self.assertEqual(len(by_mission), 2)  # missions without tasks are listed too
+
+    def test_cached_until_a_task_or_mission_changes(self):
+        self.stats()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.stats().status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        task = Task.objects.get(title='loose')
+        task.status = 'done'
+        task.save()
+        self.assertEqual(self.stats().data['tasks']['done'], 3)
+        Task.objects.get(title='no team').delete()
+        self.assertEqual(self.stats().data['tasks']['total'], 4)
+        Mission.objects.create(title='New', event=self.event, team=self.team_a)
+        self.assertEqual(self.stats().data['missions']['total'], 3)
+
+    def test_moving_a_task_updates_both_events(self):
+        other = Event.objects.create(title='Other', date=date(2025, 12, 1))
+        self.stats()
+        self.stats(other.id)
+        task = Task.objects.get(title='no team')
+        task.event = other
+        task.save()
+        self.assertEqual(self.stats().data['tasks']['total'], 4)
+        self.assertEqual(self.stats(other.id).data['tasks']['total'], 1)
+
+    def test_bulk_import_invalidates(self):
+        self.stats()
+        body = json.dumps({'type': 'task', 'title': 'imported', 'event': self.event.id, 'status': 'done'})
+        self.client.post('/bulk/import/', body, content_type='application/x-ndjson')
+        self.assertEqual(self.stats().data['tasks']['done'], 3)
+
+    def test_unknown_or_deleted_event(self):
+        self.assertEqual(self.stats(99999).status_code, 404)
+        self.stats()
+        self.event.delete()
+        self.assertEqual(self.stats().status_code, 404)
+
+
+class WorkloadIndexTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        manager_user = User.objects.create_user(username='manager_user', password='123')
+        self.manager = UserProfile.objects.create(user=manager_user, role='manager')
+        self.event = Event.objects.create(title='AI Expo', date=date(2025, 11, 10))
+        self.team = Team.objects.create(name='Tech Team', manager=self.manager, event=self.event)
+        self.staff = []
+        for i in range(3):
+            user = User.objects.create_user(username=f'staff_{i}', password='123')
+            self.staff.append(UserProfile.objects.create(user=user, role='staff'))
+        self.team.members.add(*self.staff)
+        # staff_0 is busy, staff_1 has one task, staff_2 is free
+        for status_value in ('pending', 'in_progress', 'blocked', 'done'):
+            self.task(self.staff[0], status=status_value)
+        self.task(self.staff[1])
+        self.mission = Mission.objects.create(title='Stage', event=self.event, team=self.team,
+                                              assigned_manager=self.manager)
+        self.client = APIClient()
+        self.client.force_authenticate(user=manager_user)
+
+    def task(self, assignee, **kwargs):
+        return Task.objects.create(title='t', event=self.event, team=self.team, assignee=assignee, **kwargs)
+
+    def open_tasks(self, profile):
+        return get_workloads([profile.id])[profile.id]
+
+    def test_counts_open_tasks_and_caches_them(self):
+        ids = [profile.id for profile in self.staff]
+        with CaptureQueriesContext(connection) as ctx:
+            workloads = get_workloads(ids)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(workloads[self.staff[0].id],
+                         {'total': 3, 'pending': 1, 'in_progress': 1, 'blocked': 1})
+        self.assertEqual(workloads[self.staff[2].id]['total'], 0)
+        with CaptureQueriesContext(connection) as ctx:
+            get_workloads(ids)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_signals_keep_counts_current(self):
+        task = self.task(self.staff[2])
+        self.assertEqual(self.open_tasks(self.staff[2])['total'], 1)
+        task.status = 'done'
+        task.save()
+        self.assertEqual(self.open_tasks(self.staff[2])['total'], 0)
+        task.status = 'pending'
+        task.assignee = self.staff[1]
+        task.save()
+        self.assertEqual((self.open_tasks(self.staff[1])['total'], self.open_tasks(self.staff[2])['total']), (2, 0))
+        task.delete()
+        self.assertEqual(self.open_tasks(self.staff[1])['total'], 1)
+
+    def test_split_prefers_least_loaded_available_staff(self):
+        self.staff[2].is_available = False
+        self.staff[2].save()
+        self.open_tasks(self.staff[1])  # cached before the split
+        token = RefreshToken.for_user(self.manager.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.post(f'/missions/{self.mission.id}/ai-split/')
+        self.assertEqual(response.status_code, 200)
+        # two available staff -> two subtasks, both to staff_1 (1 open) before staff_0 (3 open)
+        self.assertEqual([sub['assignee_name'] for sub in response.json()['subtasks']], ['staff_1', 'staff_1'])
+        self.assertEqual(self.open_tasks(self.staff[1])['total'], 3)
+
+    def test_approve_reassigns_unavailable_assignees(self):
+        stranded = self.task(self.staff[0], mission=self.mission, ai_generated=True)
+        kept = self.task(self.staff[0], mission=self.mission, ai_generated=True)
+        self.staff[0].is_available = False
+        self.staff[0].save()
+        self.open_tasks(self.staff[2])
+
+        response = self.client.patch(f'/missions/{self.mission.id}/approve/', {
+            'updates': [{'id': kept.id, 'assignee': 'staff_0'}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['reassigned'], [stranded.id])
+        stranded.refresh_from_db()
+        kept.refresh_from_db()
+        self.assertEqual((stranded.assignee, kept.assignee), (self.staff[2], self.staff[0]))
+        self.assertEqual(self.open_tasks(self.staff[2])['total'], 1)
+
+    def test_workload_endpoint(self):
+        self.staff[1].is_available = False
+        self.staff[1].save()
+        response = self.client.get(f'/teams/{self.team.id}/workload/')
+        self.assertEqual(response.status_code, 200)
+        members = response.data['members']
+        self.assertEqual([m['username'] for m in members], ['staff_2', 'staff_0', 'staff_1'])
+        self.assertEqual(members[1]['open_tasks']['total'], 3)
+
+        other_user = User.objects.create_user(username='other_manager', password='123')
+        UserProfile.objects.create(user=other_user, role='manager')
+        self.client.force_authenticate(user=other_user)
+        self.assertEqual(self.client.get(f'/teams/{self.team.id}/workload/').status_code, 403)
+
+
+def load_settings(**env):
+    """backend/settings.py evaluated with `env` on top of os.environ (None unsets a variable)."""
+    with mock.patch.dict(os.environ):
+        for name, value in env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        return runpy.run_path(os.path.join(settings.BASE_DIR, 'backend', 'settings.py'))
+
+
+class DatabasePoolSettingsTest(TestCase):
+    # keywords Django's postgresql DatabaseWrapper.pool passes to ConnectionPool itself
+    DJANGO_POOL_KWARGS = {'kwargs', 'open', 'configure', 'check'}
+
+    def test_pool_options_leave_django_kwargs_alone(self):
+        database = load_settings(DB_POOL='True')['DATABASES']['default']
+        pool = database['OPTIONS']['pool']
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertFalse(self.DJANGO_POOL_KWARGS & set(pool))
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError:
+            return
+        # the rest must be keywords ConnectionPool accepts
+        self.assertLessEqual(set(pool), set(inspect.signature(ConnectionPool).parameters))
+
+    def test_no_pool_by_default(self):
+        database = load_settings(DB_POOL='False')['DATABASES']['default']
+        self.assertNotIn('pool', database['OPTIONS'])
+
+    def test_asgi_does_not_keep_connections_by_default(self):
+        def conn_max_age(**env):
+            return load_settings(**{'DB_CONN_MAX_AGE': None, 'DB_POOL': 'False', **env})['DATABASES']['default']['CONN_MAX_AGE']
+        self.assertEqual(conn_max_age(SERVER_MODE='wsgi'), 60)
+        self.assertEqual(conn_max_age(SERVER_MODE='asgi'), 0)
+        self.assertEqual(conn_max_age(SERVER_MODE='asgi', DB_CONN_MAX_AGE='30'), 30)
+
+
+class CacheBackendSettingsTest(TestCase):
+    BACKEND_VARS = dict.fromkeys(('CACHE_BACKEND', 'RESPONSE_CACHE_BACKEND', 'AI_CACHE_BACKEND'))
+
+    def backends(self, **env):
+        caches_setting = load_settings(**{**self.BACKEND_VARS, **env})['CACHES']
+        return {alias: cache['BACKEND'].rsplit('.', 1)[1] for alias, cache in caches_setting.items()}
+
+    def test_several_workers_share_the_db_cache(self):
+        self.assertEqual(set(self.backends(WEB_CONCURRENCY='3').values()), {'DatabaseCache'})
+
+    def test_one_worker_keeps_locmem(self):
+        self.assertEqual(set(self.backends(WEB_CONCURRENCY=None).values()), {'LocMemCache'})
+
+    def test_gunicorn_default_worker_count_reaches_settings(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('WEB_CONCURRENCY', None)
+            conf = runpy.run_path(os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+            backends = self.backends()
+        self.assertGreater(conf['workers'], 1)
+        self.assertEqual(set(backends.values()), {'DatabaseCache'})
+
+    def test_explicit_backend_wins(self):
+        self.assertEqual(self.backends(WEB_CONCURRENCY='3', CACHE_BACKEND='locmem')['default'], 'LocMemCache')
@@ -30,6 +30,7 @@ urlpatterns = [
     # ===============================
     path('events/', views.EventListCreate.as_view()),
     path('events/<int:pk>/', views.EventDetail.as_view()),
+    path('events/<int:pk>/stats/', views.EventStats.as_view(), name='event-stats'),
 
     # ===============================
     # Teams
@@ -37,6 +38,8 @@ urlpatterns = [
     path('teams/', views.TeamListCreate.as_view(), name='team-list'),
     path('teams/<int:pk>/', views.TeamDetail.as_view(), name='team-detail'),
     path('teams/<int:pk>/add-member/', views.AddTeamMember.as_view(), name='add-team-member'),
+    path('teams/<int:pk>/members/', views.TeamMembers.as_view(), name='team-members'),
+    path('teams/<int:pk>/workload/', views.TeamWorkload.as_view(), name='team-workload'),
 
     # DELETE Team
     path('teams/<int:pk>/delete/', views.delete_team, name='team-delete'),
@@ -46,6 +49,8 @@ urlpatterns = [
     # ===============================
     path('tasks/', views.TaskListCreate.as_view()),
     path('tasks/<int:pk>/', views.TaskDetail.as_view()),
+    path('tasks/events/', views.task_events, name='task-events'),
+    path('tasks/events/ticket/', views.StreamTicket.as_view(), name='task-events-ticket'),
 
     # ===============================
     # Missions
@@ -56,11 +61,19 @@ urlpatterns = [
     # DELETE Mission
     path('missions/<int:pk>/delete/', views.delete_mission, name='mission-delete'),
 
+    # ===============================
+    # Bulk import / export
+    # ===============================
+    path('bulk/import/', views.BulkImportView.as_view(), name='bulk-import'),
+    path('bulk/export/', views.BulkExportView.as_view(), name='bulk-export'),
+
     # ===============================
     # GEMINI AI ENDPOINTS
     # ===============================
     # Organizer: AI Suggest Mission
-    path('ai/suggest-mission/', views.AISuggestMission.as_view(), name='ai-suggest-mission'),
+    path('ai/suggest-mission/', views.ai_suggest_mission, name='ai-suggest-mission'),
+    path('ai/jobs/<int:pk>/', views.AIJobDetail.as_view(), name='ai-job-detail'),
+    path('ai/cache/stats/', views.ai_cache_stats, name='ai-cache-stats'),
 
     # Manager: AI Split Mission into Subtasks
     path('missions/<int:mission_id>/ai-split/', views.ai_split_mission_view, name='ai-split-mission'),
@@ -70,4 +83,9 @@ urlpatterns = [
 
 
     path('tasks/<int:pk>/update-status/', views.StaffUpdateTaskStatus.as_view(), name='update-task-status'),
+
+    # ===============================
+    # Instrumentation (admin)
+    # ===============================
+    path('instrumentation/', views.instrumentation_report, name='instrumentation'),
 ]
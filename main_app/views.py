@@ -1,3 +1,5 @@
+import json
+
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -7,18 +9,34 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from django.conf import settings
-from .models import UserProfile, Company, Event, Team, Task, Mission
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST
+from asgiref.sync import sync_to_async
+from .models import UserProfile, Company, Event, Team, Task, Mission, AIJob, Tombstone
 from .serializers import (
     UserSerializer, UserProfileSerializer, CompanySerializer,   
-    EventSerializer, TeamSerializer, TaskSerializer, MissionSerializer
+    EventSerializer, TeamSerializer, TeamSummarySerializer, TaskSerializer, MissionSerializer,
+    MissionSummarySerializer, AIJobSerializer
+)
+from .pagination import list_response
+from .authentication import issue_stream_ticket, jwt_required, stream_ticket_required
+from .broker import OVERFLOW, get_broker, subscriber_topics
+from .permissions import (
+    IsAdmin, IsManager, IsOrganizerOrAdmin, IsOrganizerToCreate,
+    IsOrganizerOrAdminToDelete, IsTeamCreatorOrAdmin, CanChangeTask, get_access_index
 )
 
-from .ai_service import suggest_mission, split_mission  # Gemini AI
-import json
-import re
-from google import genai
-client = genai.Client()
+from .ai_service import split_mission  # Gemini AI
+from .jobs import aenqueue, fail_stale_jobs
+from .response_cache import cached_response
+from .conditional import conditional_response
+from .delta import wants_delta, delta_response
+from . import ai_cache, bulk, instrumentation, rollups, workload
 
 
 
@@ -69,7 +87,7 @@ class VerifyUserView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        profile = UserProfile.objects.get(user=request.user)
+        profile = request.profile
         refresh = RefreshToken.for_user(request.user)
         return Response({
             'refresh': str(refresh),
@@ -86,15 +104,14 @@ class ProfileList(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        profiles = UserProfile.objects.all()
-        serializer = UserProfileSerializer(profiles, many=True)
-        return Response(serializer.data)
+        profiles = UserProfile.objects.select_related('user')
+        return list_response(request, profiles, UserProfileSerializer)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_me(request):
-    profile = UserProfile.objects.get(user=request.user)
+    profile = request.profile
     return Response({
         'id': profile.id,
         'username': request.user.username,
@@ -104,13 +121,10 @@ def get_me(request):
 
 
 class ProfileDetail(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsAdmin]
 
     def patch(self, request, pk):
-        profile = UserProfile.objects.get(id=pk)
-        current_user_profile = UserProfile.objects.get(user=request.user)
-        if current_user_profile.role != 'admin':
-            return Response({"error": "Admin only"}, status=403)
+        profile = get_object_or_404(UserProfile, id=pk)
         role = request.data.get('role')
         if role not in ['staff', 'organizer', 'manager', 'admin']:
             return Response({"error": "Invalid role"}, status=400)
@@ -126,13 +140,14 @@ class CompanyListCreate(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        companies = Company.objects.all()
-        return Response(CompanySerializer(companies, many=True).data)
+        companies = Company.objects.select_related('created_by__user')
+        return cached_response(
+            request, 'companies', lambda: list_response(request, companies, CompanySerializer))
 
     def post(self, request):
         serializer = CompanySerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        profile = UserProfile.objects.get(user=request.user)
+        profile = request.profile
         company = serializer.save(created_by=profile)
         return Response(CompanySerializer(company).data, status=201)
 
@@ -141,8 +156,10 @@ class CompanyDetail(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        company = get_object_or_404(Company, pk=pk)
-        return Response(CompanySerializer(company).data)
+        def build():
+            company = get_object_or_404(Company.objects.select_related('created_by__user'), pk=pk)
+            return Response(CompanySerializer(company).data)
+        return cached_response(request, 'companies', build)
 
     def patch(self, request, pk):
         company = get_object_or_404(Company, pk=pk)
@@ -170,12 +187,13 @@ class EventListCreate(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        events = Event.objects.all()
-        return Response(EventSerializer(events, many=True).data)
+        events = Event.objects.select_related('created_by__user', 'company')
+        return cached_response(
+            request, 'events', lambda: list_response(request, events, EventSerializer))
 
     def post(self, request):
         data = request.data.copy()
-        profile = UserProfile.objects.get(user=request.user)
+        profile = request.profile
         data['created_by'] = profile.id
         if 'company' not in data or data['company'] in ['', None]:
             data['company'] = None
@@ -189,8 +207,11 @@ class EventDetail(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        event = Event.objects.get(pk=pk)
-        return Response(EventSerializer(event).data)
+        # same namespace as the list, so company renames invalidate it too
+        def build():
+            event = get_object_or_404(Event.objects.select_related('created_by__user', 'company'), pk=pk)
+            return Response(EventSerializer(event).data)
+        return cached_response(request, 'events', build)
 
     def patch(self, request, pk):
         event = Event.objects.get(pk=pk)
@@ -205,43 +226,76 @@ class EventDetail(APIView):
         return Response(status=204)
 
 
+class EventStats(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        """
+        Task and mission counts by status for the whole event, per team and
+        per mission, with a done/total `progress`. Served from the rollup
+        cache; a miss costs one grouped aggregate whatever the task count.
+        """
+        rollup = rollups.get_rollup(pk)
+        if rollup is None:
+            return Response({'error': 'Event not found'}, status=404)
+        return Response(rollup)
+
+
 # ===============================
 # Team
 # ===============================
 class TeamListCreate(generics.ListCreateAPIView):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsOrganizerToCreate]
+    denied_messages = {'POST': 'Only organizers can create teams'}
 
-    def create(self, request, *args, **kwargs):
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role != 'organizer':
-            return Response({'error': 'Only organizers can create teams'}, status=403)
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+    def list(self, request, *args, **kwargs):
+        teams = self.get_queryset()
+        serializer_class = team_serializer_class(request)
+        return conditional_response(request, teams, lambda: list_response(
+            request, serializer_class.setup_eager_loading(teams), serializer_class))
+
+
+def team_serializer_class(request):
+    # ?fields=summary -> member_count instead of member ids/usernames
+    if request.query_params.get('fields') == 'summary':
+        return TeamSummarySerializer
+    return TeamSerializer
 
 
 class TeamDetail(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsTeamCreatorOrAdmin]
+    denied_messages = {
+        'PATCH': 'Only organizer or admin can edit this team',
+        'DELETE': 'Only organizer or admin can delete this team',
+    }
+
+    def get_object(self, pk):
+        team = get_object_or_404(Team, pk=pk)
+        self.check_object_permissions(self.request, team)
+        return team
+
+    def get(self, request, pk):
+        # readable by anyone who can list teams; the permission guards writes
+        teams = Team.objects.filter(pk=pk)
+        serializer_class = team_serializer_class(request)
+
+        def build():
+            team = get_object_or_404(serializer_class.setup_eager_loading(teams))
+            return Response(serializer_class(team).data)
+        return conditional_response(request, teams, build)
 
     def patch(self, request, pk):
-        profile = UserProfile.objects.get(user=request.user)
-        team = Team.objects.get(pk=pk)
-        if profile != team.created_by and profile.role != 'admin':
-            return Response({'error': 'Only organizer or admin can edit this team'}, status=403)
+        team = self.get_object(pk)
         serializer = TeamSerializer(team, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        team = TeamSerializer.setup_eager_loading(Team.objects.filter(pk=team.pk)).get()
         return Response(TeamSerializer(team).data)
 
     def delete(self, request, pk):
-        profile = UserProfile.objects.get(user=request.user)
-        team = Team.objects.get(pk=pk)
-        if profile != team.created_by and profile.role != 'admin':
-            return Response({'error': 'Only organizer or admin can delete this team'}, status=403)
+        team = self.get_object(pk)
         team.delete()
         return Response(status=204)
 
@@ -249,24 +303,41 @@ class TeamDetail(APIView):
 # ===============================
 # Task
 # ===============================
+# Tasks embed mission/team/event titles, so their changes count as task changes
+TASK_RELATED = ('mission', 'team', 'event')
+
+
+def visible_tasks(profile):
+    if profile.role == 'manager':
+        return Task.objects.filter(Q(assignee=profile) | Q(team__manager=profile))
+    if profile.role == 'organizer':
+        return Task.objects.all()
+    return Task.objects.filter(assignee=profile)
+
+
+def visible_task_tombstones(profile):
+    tombstones = Tombstone.objects.filter(model='task')
+    if profile.role == 'manager':
+        managed = get_access_index(profile).managed_team_ids
+        return tombstones.filter(Q(assignee_id=profile.id) | Q(team_id__in=managed))
+    if profile.role == 'organizer':
+        return tombstones
+    return tombstones.filter(assignee_id=profile.id)
+
+
 class TaskListCreate(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsOrganizerToCreate]
+    denied_messages = {'POST': 'Only organizers can create tasks'}
 
     def get(self, request):
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role == 'manager':
-            tasks = Task.objects.filter(
-                assignee=profile) | Task.objects.filter(team__manager=profile)
-        elif profile.role == 'organizer':
-            tasks = Task.objects.all()
-        else:
-            tasks = Task.objects.filter(assignee=profile)
-        return Response(TaskSerializer(tasks, many=True).data)
+        tasks = visible_tasks(request.profile)
+        if wants_delta(request):
+            return delta_response(request, lambda since: tasks.filter(updated_at__gt=since),
+                                  visible_task_tombstones(request.profile), TaskSerializer)
+        return conditional_response(request, tasks, lambda: list_response(
+            request, TaskSerializer.setup_eager_loading(tasks), TaskSerializer), related=TASK_RELATED)
 
     def post(self, request):
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role != 'organizer':
-            return Response({'error': 'Only organizers can create tasks'}, status=403)
         data = request.data.copy()
         serializer = TaskSerializer(data=data)
         serializer.is_valid(raise_exception=True)
@@ -275,49 +346,154 @@ class TaskListCreate(APIView):
 
 
 class TaskDetail(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, CanChangeTask]
+    denied_messages = {'PATCH': 'You cannot edit this task', 'DELETE': 'You cannot delete this task'}
+
+    def get_object(self, pk):
+        task = get_object_or_404(Task, pk=pk)
+        self.check_object_permissions(self.request, task)
+        return task
+
+    def get(self, request, pk):
+        tasks = visible_tasks(request.profile).filter(pk=pk)
+
+        def build():
+            task = get_object_or_404(TaskSerializer.setup_eager_loading(tasks))
+            return Response(TaskSerializer(task).data)
+        return conditional_response(request, tasks, build, related=TASK_RELATED)
 
     def patch(self, request, pk):
-        profile = UserProfile.objects.get(user=request.user)
-        task = Task.objects.get(pk=pk)
-        if profile.role == 'manager' and task.assignee != profile and task.team.manager != profile:
-            return Response({'error': 'You cannot edit this task'}, status=403)
+        task = self.get_object(pk)
         serializer = TaskSerializer(task, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         task = serializer.save()
         return Response(TaskSerializer(task).data)
 
     def delete(self, request, pk):
-        profile = UserProfile.objects.get(user=request.user)
-        task = Task.objects.get(pk=pk)
-        if profile.role not in ['organizer', 'admin'] and (profile != task.assignee and profile != task.team.manager):
-            return Response({'error': 'You cannot delete this task'}, status=403)
+        task = self.get_object(pk)
         task.delete()
         return Response(status=204)
 
 
+# ===============================
+# Task/mission push channel (Server-Sent Events)
+# ===============================
+def sse_message(message):
+    return f'id: {message["id"]}\nevent: {message["type"]}\ndata: {json.dumps(message)}\n\n'
+
+
+async def event_stream(subscription, event_id=None):
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            message = await subscription.get(timeout=settings.PUSH_HEARTBEAT)
+            if message is None:
+                yield ': keepalive\n\n'
+            elif message is OVERFLOW:
+                # fell behind; the client catches up with ?since= and reconnects
+                yield 'event: resync\ndata: {}\n\n'
+                return
+            elif event_id is None or message.get('event') == event_id:
+                yield sse_message(message)
+    finally:
+        get_broker().unsubscribe(subscription)
+
+
+class StreamTicket(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Short-lived ?ticket= for /tasks/events/, so the JWT stays out of URLs and logs."""
+        return Response({'ticket': issue_stream_ticket(request.user), 'expires_in': settings.PUSH_TICKET_TTL})
+
+
+@require_GET
+@stream_ticket_required
+async def task_events(request):
+    """
+    Live `task.status` and `mission.approved` events, scoped like the task and
+    mission lists; `?event=<id>` narrows to one event. Authenticate with
+    `?ticket=` from /tasks/events/ticket/ (or an Authorization header).
+    ASGI only: WSGI buffers an async stream whole, so nothing would arrive.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Live updates need SERVER_MODE=asgi; poll with ?since= instead'},
+                            status=501)
+    profile = request.profile
+    event_id = request.GET.get('event')
+    if event_id is not None and not event_id.isdigit():
+        return JsonResponse({'error': 'event must be an id'}, status=400)
+
+    access_index = await sync_to_async(get_access_index)(profile)
+    subscription = get_broker().subscribe(subscriber_topics(profile, access_index))
+    response = StreamingHttpResponse(
+        event_stream(subscription, int(event_id) if event_id else None),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: don't buffer the stream
+    return response
+
+
 # ===============================
 # Mission
 # ===============================
+# Missions embed event/team names and their subtasks
+MISSION_RELATED = ('event', 'team', 'subtasks')
+
+
+def visible_missions(profile):
+    if profile.role == 'organizer':
+        return Mission.objects.all()
+    if profile.role == 'manager':
+        return Mission.objects.filter(team__manager=profile)
+    if profile.role == 'staff':
+        return Mission.objects.filter(team__members=profile)
+    return Mission.objects.none()  # admin يشوف كله من Organizer
+
+
+def visible_mission_tombstones(profile):
+    tombstones = Tombstone.objects.filter(model='mission')
+    if profile.role == 'organizer':
+        return tombstones
+    if profile.role == 'manager':
+        return tombstones.filter(team_id__in=get_access_index(profile).managed_team_ids)
+    if profile.role == 'staff':
+        return tombstones.filter(team_id__in=get_access_index(profile).member_team_ids)
+    return tombstones.none()
+
+
+def missions_changed_since(missions, since):
+    """Missions whose own row, or a subtask (edited or deleted), changed after `since`."""
+    return missions.filter(
+        Q(updated_at__gt=since)
+        | Q(id__in=Task.objects.filter(updated_at__gt=since).values('mission_id'))
+        | Q(id__in=Tombstone.objects.filter(model='task', deleted_at__gt=since).values('mission_id'))
+    )
+
+
 class MissionListCreate(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsOrganizerToCreate]
+    denied_messages = {'POST': 'Only organizers can create missions'}
 
     def get(self, request):
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role == 'organizer':
-            missions = Mission.objects.all()
-        elif profile.role == 'manager':
-            missions = Mission.objects.filter(team__manager=profile)
-        elif profile.role == 'staff':
-            missions = Mission.objects.filter(team__members=profile)
+        missions = visible_missions(request.profile)
+
+        # ?fields=summary -> counts only; default / ?expand=subtasks -> nested subtasks
+        if request.query_params.get('fields') == 'summary' and \
+                'subtasks' not in request.query_params.get('expand', '').split(','):
+            serializer_class = MissionSummarySerializer
         else:
-            missions = Mission.objects.none()  # admin يشوف كله من Organizer
-        return Response(MissionSerializer(missions, many=True).data)
+            serializer_class = MissionSerializer
+        if wants_delta(request):
+            return delta_response(request, lambda since: missions_changed_since(missions, since),
+                                  visible_mission_tombstones(request.profile), serializer_class)
+        return conditional_response(request, missions, lambda: list_response(
+            request, serializer_class.setup_eager_loading(missions), serializer_class),
+            related=MISSION_RELATED)
 
     def post(self, request):
-        profile = UserProfile.objects.get(user=request.user)
-        if profile.role != 'organizer':
-            return Response({'error': 'Only organizers can create missions'}, status=403)
+        profile = request.profile
         data = request.data.copy()
         data['created_by'] = profile.id
         serializer = MissionSerializer(data=data)
@@ -326,7 +502,16 @@ class MissionListCreate(APIView):
         return Response(MissionSerializer(mission).data, status=201)
     
 class MissionDetail(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsOrganizerOrAdminToDelete]
+    denied_messages = {'DELETE': 'Only organizers or admins can delete missions'}
+
+    def get(self, request, pk):
+        missions = visible_missions(request.profile).filter(pk=pk)
+
+        def build():
+            mission = get_object_or_404(MissionSerializer.setup_eager_loading(missions))
+            return Response(MissionSerializer(mission).data)
+        return conditional_response(request, missions, build, related=MISSION_RELATED)
 
     def patch(self, request, pk):
         mission = Mission.objects.get(pk=pk)
@@ -337,10 +522,7 @@ class MissionDetail(APIView):
         return Response(serializer.data)
 
     def delete(self, request, pk):
-        profile = UserProfile.objects.get(user=request.user)
-        mission = Mission.objects.get(pk=pk)
-        if profile.role not in ['organizer', 'admin']:
-            return Response({'error': 'Only organizers or admins can delete missions'}, status=403)
+        mission = get_object_or_404(Mission, pk=pk)
         mission.delete()
         return Response(status=204)
 
@@ -349,193 +531,291 @@ class MissionDetail(APIView):
 # Add Member to Team
 # ===============================
 class AddTeamMember(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsOrganizerOrAdmin]
+    denied_messages = {'POST': 'Not authorized'}
 
     def post(self, request, pk):
-        profile = UserProfile.objects.get(user=request.user)
-        team = Team.objects.get(pk=pk)
-        if profile.role not in ['organizer', 'admin']:
-            return Response({'error': 'Not authorized'}, status=403)
+        team = get_object_or_404(Team, pk=pk)
         member_id = request.data.get('member_id')
         if not member_id:
             return Response({'error': 'member_id is required'}, status=400)
         try:
-            member_profile = UserProfile.objects.get(id=member_id)
+            member_profile = UserProfile.objects.select_related('user').get(id=member_id)
         except UserProfile.DoesNotExist:
             return Response({'error': 'User not found'}, status=404)
         team.members.add(member_profile)
-        team.save()
         return Response({'message': f'{member_profile.user.username} added to {team.name}'})
 
+
+def _id_list(value):
+    if not isinstance(value, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in value):
+        raise ValueError
+    return set(value)
+
+
+class TeamMembers(APIView):
+    permission_classes = [IsAuthenticated, IsOrganizerOrAdmin]
+
+    def patch(self, request, pk):
+        """
+        Add and remove many members at once:
+            {"add": [profile ids], "remove": [profile ids]}
+        Unknown ids reject the whole request. Returns only what changed:
+            {"team": 3, "added": [...], "removed": [...], "member_count": 42}
+        """
+        try:
+            to_add = _id_list(request.data.get('add', []))
+            to_remove = _id_list(request.data.get('remove', []))
+        except ValueError:
+            return Response({'error': 'add and remove must be lists of profile ids'}, status=400)
+        if to_add & to_remove:
+            return Response({'error': 'Ids both added and removed',
+                             'ids': sorted(to_add & to_remove)}, status=400)
+
+        with transaction.atomic():
+            # lock the team so concurrent edits can't interleave their diffs
+            team = get_object_or_404(Team.objects.select_for_update(), pk=pk)
+            known = set(UserProfile.objects.filter(id__in=to_add | to_remove).values_list('id', flat=True))
+            unknown = (to_add | to_remove) - known
+            if unknown:
+                return Response({'error': 'Profiles not found', 'ids': sorted(unknown)}, status=400)
+
+            current = set(team.members.values_list('id', flat=True))
+            added = to_add - current
+            removed = to_remove & current
+            # add()/remove() are one through-table insert/delete each and still
+            # send m2m_changed, so the cache and access-index signals run
+            if added:
+                team.members.add(*added)
+            if removed:
+                team.members.remove(*removed)
+
+        return Response({
+            'team': team.id,
+            'added': sorted(added),
+            'removed': sorted(removed),
+            'member_count': len(current) + len(added) - len(removed),
+        })
+
+
 # ===============================
-# Gemini AI: Organizer Suggest Mission 
+# Bulk import / export (bulk.py)
 # ===============================
-class AISuggestMission(APIView):
-    permission_classes = [IsAuthenticated]
+class BulkImportView(APIView):
+    permission_classes = [IsAuthenticated, IsOrganizerOrAdmin]
 
     def post(self, request):
-        event_id = request.data.get('event')
-        if not event_id:
-            return Response({'error': 'Event ID required'}, status=400)
+        """
+        NDJSON body (or text/csv), one object per row; `?type=` is the type
+        for rows without one. The body is read a line at a time, never whole.
+        Returns {"created": {type: count}, "errors": [{line, type, ref, errors}]}.
+        """
+        file_format = 'csv' if request.content_type == 'text/csv' else 'ndjson'
+        default_type = request.query_params.get('type')
+        if default_type is not None and default_type not in bulk.SERIALIZERS:
+            return Response({'error': f'type must be one of {", ".join(bulk.SERIALIZERS)}'}, status=400)
+        lines = iter(request.stream.readline, b'') if request.stream is not None else []
+        report = bulk.import_rows(lines, file_format, profile=request.profile, default_type=default_type)
+        return Response(report, status=201 if any(report['created'].values()) else 400)
 
-        try:
-            event = Event.objects.get(id=event_id)
-        except Event.DoesNotExist:
-            return Response({'error': 'Event not found'}, status=404)
 
-        # جمع كل أعضاء الفرق المرتبطة بالحدث
-        team_members_usernames = []
-        event_teams = event.teams.all()
-        for team in event_teams:
-            team_members_usernames.extend([member.user.username for member in team.members.all()])
-        team_members_str = ', '.join(team_members_usernames) if team_members_usernames else 'No members'
-
-        # تحسين البرومت ليكون أكثر تحديداً
-        prompt = f"""
-        You are a professional AI event planner. Your task is to create ONE realistic and actionable mission
-        for this event, suitable to be assigned to the team manager. Consider the event details:
-
-        - Event Title: {event.title}
-        - Event Date: {event.date}
-        - Event Location: {event.location}
-        - Event Type: {event.event_type if hasattr(event, 'event_type') else 'General'}
-        - Expected Attendees: {event.expected_attendees if hasattr(event, 'expected_attendees') else 'Unknown'}
-        - Available Team Members: {team_members_str}
-
-        Requirements:
-        - Must be actionable and assignable to a manager.
-        - Include a clear title (short, descriptive).
-        - Include a description (1-2 sentences) explaining what needs to be done and why.
-        - Consider potential challenges.
-
-        Return ONLY a JSON in this exact format:
-        {{
-          "title": "short descriptive title",
-          "description": "1-2 sentence explanation of the mission"
-        }}
-        """
+class BulkExportView(APIView):
+    permission_classes = [IsAuthenticated, IsOrganizerOrAdmin]
 
+    def get(self, request):
+        """
+        Streamed NDJSON of ?type=event,team,mission,task (default: all), read
+        from the DB in chunks; `?event=<id>` limits it to one event and
+        `?as=csv` writes CSV (one type only). Import-compatible.
+        """
         try:
-            response = client.models.generate_content(model="gemini-2.5-flash", contents=prompt)
-            text = response.text.strip()
-
-            start = text.find('{')
-            end = text.rfind('}') + 1
-            if start == -1 or end == 0:
-                return Response({'error': 'No JSON found in AI response'}, status=500)
-
-            json_str = text[start:end]
-            suggestion = json.loads(json_str)
-
-            # اختيار أول فريق مرتبط بالحدث كـ default
-            team = event_teams.first()
-            if not team:
-                return Response({'error': 'No team found for this event'}, status=400)
-
-            manager = event.teams.first().manager 
-            if not manager:
-                return Response({'error': 'No manager assigned to the team'}, status=400)
-
-            mission = Mission.objects.create(
-                title=suggestion['title'],
-                description=suggestion['description'],
-                event=event,
-                team=team,
-                assigned_manager=manager,
-                created_by=UserProfile.objects.get(user=request.user)
-            )
+            types = bulk.parse_types(request.query_params.get('type'))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=400)
+        event_id = request.query_params.get('event')
+        if event_id is not None and not event_id.isdigit():
+            return Response({'error': 'event must be an id'}, status=400)
+        rows = bulk.export_rows(types, int(event_id) if event_id else None)
+
+        if request.query_params.get('as') == 'csv':
+            if len(types) != 1:
+                return Response({'error': 'CSV export takes exactly one type'}, status=400)
+            response = StreamingHttpResponse(bulk.write_csv(rows, types[0]), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="{types[0]}s.csv"'
+            return response
+        return StreamingHttpResponse(bulk.write_ndjson(rows), content_type='application/x-ndjson')
+
+
+class TeamWorkload(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        """
+        Open task counts for each team member, least loaded available staff
+        first. For the team's manager and organizers/admins.
+        """
+        team = get_object_or_404(Team, pk=pk)
+        profile = request.profile
+        if profile.role not in ('organizer', 'admin') and \
+                team.id not in get_access_index(profile).managed_team_ids:
+            return Response({'error': 'Only the team manager can see its workload'}, status=403)
+
+        members = list(team.members.select_related('user').order_by('id'))
+        workloads = workload.get_workloads([member.id for member in members])
+        members.sort(key=lambda member: (not member.is_available, workloads[member.id]['total'], member.id))
+        return Response({
+            'team': team.id,
+            'members': [{
+                'profile': member.id,
+                'username': member.user.username,
+                'role': member.role,
+                'is_available': member.is_available,
+                'current_team': member.current_team,
+                'open_tasks': workloads[member.id],
+            } for member in members],
+        })
 
-            return Response({
-                "mission": {
-                    "id": mission.id,
-                    "title": mission.title,
-                    "description": mission.description,
-                    "manager": manager.user.username
-                }
-            }, status=201)
 
-        except json.JSONDecodeError as e:
-            return Response({'error': f'Invalid JSON from AI: {str(e)}'}, status=500)
-        except Exception as e:
-            return Response({'error': f'Gemini failed: {str(e)}'}, status=500)
+def request_data(request):
+    """JSON or form body for the plain async views (DRF's request.data isn't available)."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST
 
 # ===============================
-# AI Service: Dynamic Split Mission
+# Gemini AI: Organizer Suggest Mission 
 # ===============================
-def split_mission(title, description, team_members):
+@require_POST
+@jwt_required
+async def ai_suggest_mission(request):
     """
-    Dynamically split a mission into subtasks and assign each to a team member.
-    team_members: QuerySet of UserProfile objects
+    Queue a Gemini suggestion for the event and return 202 with the job id.
+    The mission is created by the worker; poll /ai/jobs/<id>/ for the result.
+    Async so that, under ASGI, neither the lookups nor the job hold a thread.
     """
-    subtasks = []
-    staff_members = [member for member in team_members if member.role == 'staff']
-    if not staff_members:
-        return subtasks
-
-    # Create 1 subtask per staff member
-    for i, member in enumerate(staff_members, start=1):
-        task_title = f"{title} - Subtask {i}"
-        task_description = f"Task for {member.user.username}: {description[:50]}..."  # Short preview
-        subtasks.append({
-            "title": task_title,
-            "description": task_description,
-            "assignee": member.user.username
-        })
+    event_id = request_data(request).get('event')
+    if not event_id:
+        return JsonResponse({'error': 'Event ID required'}, status=400)
+
+    try:
+        event = await Event.objects.aget(id=event_id)
+    except (Event.DoesNotExist, ValueError):
+        return JsonResponse({'error': 'Event not found'}, status=404)
+
+    # Fail fast on what the worker would reject anyway
+    team = await event.teams.order_by('id').afirst()
+    if not team:
+        return JsonResponse({'error': 'No team found for this event'}, status=400)
+    if not team.manager_id:
+        return JsonResponse({'error': 'No manager assigned to the team'}, status=400)
+
+    job = await AIJob.objects.acreate(
+        kind='suggest_mission',
+        payload={'event': event.id},
+        created_by=request.profile
+    )
+    job = await aenqueue(job)
+    return JsonResponse(AIJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class AIJobDetail(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        fail_stale_jobs(AIJob.objects.filter(pk=pk))  # its worker may have exited
+        job = get_object_or_404(AIJob, pk=pk, created_by__user=request.user)
+        return Response(AIJobSerializer(job).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def ai_cache_stats(request):
+    return Response(ai_cache.get_stats())
 
-    return subtasks
 
+# ===============================
+# Instrumentation (admin)
+# ===============================
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated, IsAdmin])
+def instrumentation_report(request):
+    """
+    Slowest views, worst duplicated queries and DB connection/pool state for
+    this process; DELETE resets the view and query aggregates.
+    """
+    if request.method == 'DELETE':
+        instrumentation.aggregator.reset()
+        return Response(status=204)
+    return Response({
+        **instrumentation.aggregator.report(),
+        'database': instrumentation.database_stats(),
+    })
 
 # ===============================
 # AI Split Mission View (Dynamic)
 # ===============================
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def ai_split_mission_view(request, mission_id):
-    profile = UserProfile.objects.get(user=request.user)
+@require_POST
+@jwt_required
+async def ai_split_mission_view(request, mission_id):
+    profile = request.profile
 
     try:
-        mission = Mission.objects.get(id=mission_id, assigned_manager=profile)
+        mission = await Mission.objects.select_related('team', 'event').aget(
+            id=mission_id, assigned_manager=profile)
     except Mission.DoesNotExist:
-        return Response({"error": "Mission not found or not assigned to you"}, status=404)
-
-    team_members = mission.team.members.all()
-    if not team_members.exists():
-        return Response({"error": "No members in team"}, status=400)
-
-    # Generate dynamic subtasks
-    subtasks_data = split_mission(mission.title, mission.description or "", team_members)
-    created_tasks = []
-
-    for sub in subtasks_data:
-        try:
-            assignee = UserProfile.objects.get(user__username=sub['assignee'])
-            task = Task.objects.create(
-                title=sub['title'],
-                description=sub.get('description', ''),
-                mission=mission,
-                assignee=assignee,
-                team=mission.team,
-                event=mission.event,
-                ai_generated=True,
-                created_by=profile
-            )
-            created_tasks.append(TaskSerializer(task).data)
-        except UserProfile.DoesNotExist:
-            continue  # Skip if user not found
-
-    mission.ai_split = True
-    mission.save()
+        return JsonResponse({"error": "Mission not found or not assigned to you"}, status=404)
+
+    team_members = [m async for m in mission.team.members.select_related('user').order_by('id')]
+    if not team_members:
+        return JsonResponse({"error": "No members in team"}, status=400)
+
+    # Generate dynamic subtasks, spread over whoever has the least open work
+    workloads = await sync_to_async(workload.get_workloads)([member.id for member in team_members])
+    subtasks_data = split_mission(mission.title, mission.description or "", team_members, workloads)
+
+    # split_mission only assigns team members, so this map resolves every subtask
+    profiles_by_username = {member.user.username: member for member in team_members}
+
+    tasks = [
+        Task(
+            title=sub['title'],
+            description=sub.get('description', ''),
+            mission=mission,
+            assignee=profiles_by_username[sub['assignee']],
+            team=mission.team,
+            event=mission.event,
+            ai_generated=True,
+            created_by=profile
+        )
+        for sub in subtasks_data
+    ]
 
-    return Response({
-        "subtasks": created_tasks,
+    return JsonResponse({
+        "subtasks": await sync_to_async(_save_split)(mission, tasks),
         "message": "AI split successful"
     })
 
+
+def _save_split(mission, tasks):
+    # All subtasks and the ai_split flag land together or not at all
+    # (transactions are sync-only, hence this helper)
+    with transaction.atomic():
+        tasks = Task.objects.bulk_create(tasks)  # no signals; the mission save below refreshes the rollup
+        mission.ai_split = True
+        mission.save(update_fields=['ai_split', 'updated_at'])
+    workload.invalidate(*{task.assignee_id for task in tasks})
+    return TaskSerializer(tasks, many=True).data
+
 # ===============================
 # Manager Approve & Edit AI Split Tasks
 # ===============================
 class ManagerApproveTasks(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsManager]
+    denied_messages = {'PATCH': 'Only managers can approve tasks'}
 
     def patch(self, request, pk):
         """
@@ -546,10 +826,12 @@ class ManagerApproveTasks(APIView):
                 {"id": 12, "title": "New Title", "description": "Updated description", "assignee": "username"}
             ]
         }
+        The batch is applied atomically: if any entry is invalid, nothing is
+        saved and a 400 lists the per-item errors. Subtasks left unassigned,
+        or with an unavailable assignee the manager didn't pick explicitly,
+        go to the least-loaded available staff of the team (`reassigned`).
         """
-        manager_profile = UserProfile.objects.get(user=request.user)
-        if manager_profile.role != "manager":
-            return Response({"error": "Only managers can approve tasks"}, status=403)
+        manager_profile = request.profile
 
         try:
             mission = Mission.objects.get(pk=pk, assigned_manager=manager_profile)
@@ -558,52 +840,138 @@ class ManagerApproveTasks(APIView):
 
         tasks = Task.objects.filter(mission=mission, ai_generated=True)
         updates = request.data.get("updates", [])
-
-        for update in updates:
-            try:
-                task = tasks.get(id=update["id"])
-                # Update fields
-                if "title" in update:
-                    task.title = update["title"]
-                if "description" in update:
-                    task.description = update["description"]
+        if not isinstance(updates, list):
+            return Response({"error": "updates must be a list"}, status=400)
+
+        with transaction.atomic():
+            # Two lookups for the whole batch: the mission's subtasks (with their
+            # assignees, for availability) and the named assignees
+            tasks_by_id = {
+                task.id: task for task in tasks.select_related('assignee').select_for_update(of=('self',))
+            }
+            previous_assignees = {task.id: task.assignee_id for task in tasks_by_id.values()}
+            usernames = {update["assignee"] for update in updates
+                         if isinstance(update, dict) and isinstance(update.get("assignee"), str)}
+            assignees = {
+                assignee.user.username: assignee
+                for assignee in UserProfile.objects.select_related('user').filter(user__username__in=usernames)
+            } if usernames else {}
+
+            errors = []
+            changed = {}
+            touched_fields = set()
+            for index, update in enumerate(updates):
+                if not isinstance(update, dict) or "id" not in update:
+                    errors.append({"index": index, "error": "id is required"})
+                    continue
+                type_error = _approve_update_type_error(update)
+                if type_error:
+                    errors.append({"index": index, "error": type_error})
+                    continue
+                task = tasks_by_id.get(update["id"])
+                if task is None:
+                    errors.append({"index": index, "id": update["id"], "error": "Task not found in this mission"})
+                    continue
+                if "assignee" in update and update["assignee"] not in assignees:
+                    errors.append({"index": index, "id": update["id"], "error": f'User {update["assignee"]} not found'})
+                    continue
+                for field in ("title", "description"):
+                    if field in update:
+                        setattr(task, field, update[field])
+                        touched_fields.add(field)
                 if "assignee" in update:
-                    assignee = UserProfile.objects.filter(user__username=update["assignee"]).first()
-                    if assignee:
-                        task.assignee = assignee
-                task.save()
-            except Task.DoesNotExist:
-                continue
-
-        mission.is_approved = True  # بعد الموافقة يروح للـ staff رسمي
-        mission.save()
+                    task.assignee = assignees[update["assignee"]]
+                    touched_fields.add("assignee")
+                changed[task.id] = task
+
+            if errors:
+                transaction.set_rollback(True)
+                return Response({"error": "Some updates are invalid", "errors": errors}, status=400)
+
+            explicit = {update["id"] for update in updates if "assignee" in update}
+            reassigned = _reassign_stranded(mission, [
+                task for task in tasks_by_id.values()
+                if task.id not in explicit and (task.assignee is None or not task.assignee.is_available)
+            ])
+            if reassigned:
+                changed.update((task.id, task) for task in reassigned)
+                touched_fields.add("assignee")
+
+            if changed:
+                # bulk_update skips auto_now, so stamp updated_at by hand
+                now = timezone.now()
+                for task in changed.values():
+                    task.updated_at = now
+                Task.objects.bulk_update(changed.values(), sorted(touched_fields | {'updated_at'}))
+                if "assignee" in touched_fields:
+                    workload.invalidate(*{previous_assignees[task_id] for task_id in changed},
+                                        *{task.assignee_id for task in changed.values()})
+                    # no post_save either: tell the old assignees the task left them
+                    Tombstone.objects.bulk_create([
+                        Tombstone(model='task', object_id=task.id, team_id=task.team_id,
+                                  assignee_id=previous_assignees[task.id], mission_id=task.mission_id)
+                        for task in changed.values() if task.assignee_id != previous_assignees[task.id]
+                    ])
+
+            mission.is_approved = True  # بعد الموافقة يروح للـ staff رسمي
+            mission.save(update_fields=['is_approved', 'updated_at'])
 
         return Response({
             "message": "Tasks updated and approved successfully.",
-            "subtasks": TaskSerializer(tasks, many=True).data
+            "reassigned": sorted(task.id for task in reassigned),
+            "subtasks": TaskSerializer(TaskSerializer.setup_eager_loading(tasks), many=True).data
         }, status=200)
 
 
+def _approve_update_type_error(update):
+    """Message for the first field of an approve update with the wrong type (or a too long title), else None."""
+    if not isinstance(update["id"], int) or isinstance(update["id"], bool):
+        return "id must be an integer"
+    if "assignee" in update and not isinstance(update["assignee"], str):
+        return "assignee must be a username"
+    if "title" in update and not isinstance(update["title"], str):
+        return "title must be a string"
+    # Postgres would reject it with a DataError (a 500) at bulk_update
+    max_length = Task._meta.get_field("title").max_length
+    if "title" in update and len(update["title"]) > max_length:
+        return f"title must be at most {max_length} characters"
+    if "description" in update and not isinstance(update["description"], (str, type(None))):
+        return "description must be a string"
+    return None
+
+
+def _reassign_stranded(mission, stranded):
+    """Give `stranded` tasks to the team's least-loaded available staff; returns the tasks moved."""
+    if not stranded:
+        return []
+    staff = list(mission.team.members.filter(role='staff', is_available=True).order_by('id'))
+    picks = workload.pick_assignees(staff, len(stranded), workload.get_workloads([member.id for member in staff]))
+    for task, member in zip(stranded, picks):
+        task.assignee = member
+    return stranded[:len(picks)]
+
+
 
 # ===============================
 # DELETE handlers using get_object_or_404
 # ===============================
 @api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
 def delete_team(request, pk):
     team = get_object_or_404(Team, pk=pk)
-    profile = UserProfile.objects.get(user=request.user)
-    if profile != team.created_by and profile.role != 'admin':
+    if not IsTeamCreatorOrAdmin().has_object_permission(request, None, team):
         return Response({'error': 'Only organizer or admin can delete this team'}, status=403)
     team.delete()
     return Response({'message': 'Team deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
 
 @api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
 def delete_mission(request, pk):
-    mission = get_object_or_404(Mission, pk=pk)
-    profile = UserProfile.objects.get(user=request.user)
-    if profile.role not in ['organizer', 'admin']:
+    # function views can't carry denied_messages, so the wording is checked here
+    if not IsOrganizerOrAdmin().has_permission(request, None):
         return Response({'error': 'Only organizers or admins can delete missions'}, status=403)
+    mission = get_object_or_404(Mission, pk=pk)
     mission.delete()
     return Response({'message': 'Mission deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
@@ -613,7 +981,7 @@ class StaffUpdateTaskStatus(APIView):
     permission_classes = [IsAuthenticated]
 
     def patch(self, request, pk):
-        profile = UserProfile.objects.get(user=request.user)
+        profile = request.profile
         
         # السماح فقط للstaff اللي مخصص له المهمة
         try:
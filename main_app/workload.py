@@ -0,0 +1,74 @@
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Task, TASK_STATUS_CHOICES
+
+
+# ===============================
+# Workload index (open tasks per profile)
+# ===============================
+# Open task counts by status for each profile. Counts are cached, and the
+# misses are filled from one grouped query over task_open_assignee_idx.
+# Signals in signals.py drop a profile's entry when one of its tasks is
+# saved, reassigned or deleted. Paths that skip signals drop it themselves:
+# bulk_create in the AI split and bulk import, bulk_update in approve.
+
+OPEN_STATUSES = [value for value, _ in TASK_STATUS_CHOICES if value != 'done']
+
+
+def _key(profile_id):
+    return f'workload:{profile_id}'
+
+
+def _empty():
+    return {'total': 0, **{value: 0 for value in OPEN_STATUSES}}
+
+
+def get_workloads(profile_ids):
+    """{profile id: {"total": n, "pending": n, ...}} for open (not done) tasks."""
+    keys = {_key(profile_id): profile_id for profile_id in profile_ids}
+    workloads = {keys[key]: counts for key, counts in cache.get_many(keys).items()}
+    missing = [profile_id for profile_id in keys.values() if profile_id not in workloads]
+    if missing:
+        built = {profile_id: _empty() for profile_id in missing}
+        rows = (
+            Task.objects.filter(assignee_id__in=missing).exclude(status='done')
+            .values_list('assignee_id', 'status')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+        for profile_id, status, n in rows:
+            built[profile_id][status] += n
+            built[profile_id]['total'] += n
+        cache.set_many({_key(profile_id): counts for profile_id, counts in built.items()},
+                       settings.WORKLOAD_CACHE_TTL)
+        workloads.update(built)
+    return workloads
+
+
+def invalidate(*profile_ids):
+    cache.delete_many([_key(profile_id) for profile_id in profile_ids if profile_id])
+
+
+def pick_assignees(members, count, workloads):
+    """
+    `count` assignees from the available staff in `members`, least loaded
+    first. Each pick counts as one more open task, so work spreads evenly.
+    Returns [] when nobody is available.
+    """
+    heap = [
+        (workloads.get(member.id, {}).get('total', 0), member.id, member)
+        for member in members if member.role == 'staff' and member.is_available
+    ]
+    if not heap:
+        return []
+    heapq.heapify(heap)
+    picks = []
+    for _ in range(count):
+        load, member_id, member = heapq.heappop(heap)
+        picks.append(member)
+        heapq.heappush(heap, (load + 1, member_id, member))
+    return picks